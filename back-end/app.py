@@ -1,21 +1,39 @@
-from flask import Flask, request, jsonify, send_from_directory
+import time
+process_started = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify, send_file, abort
 from flask_cors import CORS
+import atexit
+import hmac
+import io
 import os
-import uuid
-import sys
-
-try:
-    import tensorflow as tf
-    from tensorflow.keras.models import load_model
-    print(f"TensorFlow version: {tf.__version__}")
-except ImportError as e:
-    print("Error importing TensorFlow:", e)
-    sys.exit(1)
-
-from services.prediction_service import predict_herb
-from services.herb_service import get_herb_by_name, get_recommendations_by_symptoms, seed_database
-from utils.image_utils import preprocess_image
-from pymongo import MongoClient
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from services.batch_scheduler import BatchScheduler
+from services.prediction_service import (
+    engine_for_path, import_tensorflow, load_inference_backend, model_path_for_engine, serving_batch_sizes,
+    warmup_backend
+)
+from services.prediction_cache import PredictionCache, model_version
+from services.phash_index import PerceptualIndex
+from services.herb_service import get_herb_for_class, get_herbs_for_classes, get_recommendations_by_symptoms, seed_database
+from utils.image_utils import decode_image_bytes, dhash, prepare_image
+from services.upload_storage import find_upload, retention_stats, save_upload, start_retention_gc, wait_for_upload
+from services.db_service import connect, get_db, is_connected
+from services.herb_catalog import catalog
+from services.herb_resolver import resolver
+from services.migrations import run_startup_migrations, schema_status
+from services.symptom_matcher import matcher
+from services.recommendation_cache import recommendation_cache
+from services.profiler import folded, profiler
+from utils.tracing import TraceRecorder
+from services.metrics import (
+    ERRORS_TOTAL, METRICS_CONTENT_TYPE, PIPELINE_STAGE_SECONDS, PREDICTIONS_TOTAL, REQUEST_SECONDS, REQUESTS_TOTAL, registry
+)
 from config import Config
 
 # Initialize Flask app
@@ -26,40 +44,403 @@ CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 # Load configuration
 app.config.from_object(Config)
 
-# Connect to MongoDB
-try:
-    client = MongoClient(app.config['MONGO_URI'])
-    db = client[app.config['MONGO_DB_NAME']]
-    
-    # Test connection
-    client.server_info()
-    print("Successfully connected to MongoDB")
+# Create upload directory if it doesn't exist
+os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+# Everything slow (database preparation, TensorFlow, the model and its warmup)
+# happens on background threads so routes are servable immediately.
+# Model state moves loading -> warming -> ready (or "not loaded" on failure).
+model = None
+model_state = "loading"
+scheduler = None
+prediction_cache = None
+phash_index = None
+warmup_timings = {}
+startup_phases = {}
+
+def record_phase(name, started):
+    """Record how long a startup phase took, in milliseconds"""
+    startup_phases[name] = round((time.perf_counter() - started) * 1000.0, 1)
+
+def prepare_database():
+    """Connect to the shared MongoDB pool, migrate, seed once and load the in-memory indexes"""
+    started = time.perf_counter()
+    db = connect()
+    record_phase("database_connect", started)
+    if db is None:
+        print("Starting app without database connection.")
+        return
     
-    # Seed database if it's empty
-    if db.herbs.count_documents({}) == 0:
-        print("Seeding database with initial data...")
+    try:
+        if app.config['MIGRATE_ON_STARTUP']:
+            started = time.perf_counter()
+            run_startup_migrations(db)
+            record_phase("database_migrate", started)
+        
+        started = time.perf_counter()
         seed_database(db)
+        record_phase("database_seed", started)
         
-except Exception as e:
-    print(f"Error connecting to MongoDB: {str(e)}")
-    print("Starting app without database connection.")
-    db = None
-
-# Create upload directory if it doesn't exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        started = time.perf_counter()
+        catalog.load(db)
+        resolver.build()
+        catalog.watch(db)
+        matcher.load(db)
+        matcher.watch(db)
+        record_phase("catalog_load", started)
+    except Exception as e:
+        print(f"Error preparing database: {str(e)}")
 
-# Load the trained model
-try:
-    model_path = app.config['MODEL_PATH']
-    if os.path.exists(model_path):
-        model = load_model(model_path)
+def load_backend():
+    """
+    Import the inference engine and load the model without running it
+    
+    Returns:
+        tuple: (backend or None on failure, model_path)
+    """
+    # Load the trained model with the configured inference engine
+    model_path = model_path_for_engine(app.config['INFERENCE_ENGINE'])
+    engine = app.config['INFERENCE_ENGINE'].lower()
+    if engine == "auto":
+        engine = engine_for_path(model_path)
+    try:
+        if engine != "onnx":
+            started = time.perf_counter()
+            tf = import_tensorflow()
+            record_phase("tensorflow_import", started)
+            print(f"TensorFlow version: {tf.__version__}")
+        
+        started = time.perf_counter()
+        backend = load_inference_backend(
+            app.config['INFERENCE_ENGINE'], model_path, batch_sizes=serving_batch_sizes(app.config['BATCH_MAX_SIZE'])
+        )
+        record_phase("model_load", started)
         print(f"Model loaded successfully from {model_path}")
-    else:
-        print(f"Model file not found at {model_path}")
-        model = None
-except Exception as e:
-    print(f"Error loading model: {str(e)}")
-    model = None
+        return backend, model_path
+    except Exception as e:
+        print(f"Error loading model: {str(e)}")
+        return None, model_path
+
+def prepare_model(preloaded=None):
+    """
+    Load the model (unless preloaded), build the result caches and warm up
+    
+    Args:
+        preloaded: (backend, model_path) from load_backend() run before a fork
+    """
+    global model, model_state, scheduler, prediction_cache, phash_index
+    
+    backend, model_path = preloaded if preloaded is not None else load_backend()
+    if backend is None:
+        model_state = "not loaded"
+        return
+    
+    # Repeat uploads of the same bytes reuse earlier results
+    started = time.perf_counter()
+    current_model_version = model_version(model_path)
+    prediction_cache = PredictionCache(
+        current_model_version,
+        max_entries=app.config['PREDICTION_CACHE_SIZE'],
+        ttl=app.config['PREDICTION_CACHE_TTL'],
+        disk_path=app.config['PREDICTION_CACHE_PATH']
+    )
+    
+    # Near-duplicate photos (resized, re-encoded) reuse earlier results too
+    if app.config['PHASH_INDEX_ENABLED']:
+        phash_index = PerceptualIndex(
+            current_model_version,
+            max_entries=app.config['PHASH_INDEX_SIZE'],
+            max_distance=app.config['PHASH_MAX_DISTANCE'],
+            path=app.config['PHASH_INDEX_PATH']
+        )
+        atexit.register(phash_index.save)
+    record_phase("result_caches", started)
+    
+    # Batch concurrent predictions into shared forward passes
+    model = backend
+    scheduler = BatchScheduler(
+        model,
+        max_batch_size=app.config['BATCH_MAX_SIZE'],
+        max_wait_ms=app.config['BATCH_MAX_WAIT_MS']
+    )
+    
+    # Warm every configured batch shape before the model is reported ready
+    model_state = "warming"
+    try:
+        started = time.perf_counter()
+        # The same shapes the Keras backend pads to under XLA
+        warmup_timings.update(warmup_backend(model, serving_batch_sizes(app.config['BATCH_MAX_SIZE'])))
+        record_phase("warmup", started)
+        model_state = "ready"
+        print("Model warmed up and ready")
+    except Exception as e:
+        print(f"Error warming up model: {str(e)}")
+        model_state = "not loaded"
+    
+    startup_phases["total_until_ready"] = round((time.perf_counter() - process_started) * 1000.0, 1)
+
+def model_unavailable_response():
+    """Error response for prediction routes while the model is not ready (None when ready)"""
+    if model_state == "ready":
+        return None
+    if model_state == "not loaded":
+        return jsonify({"error": "Model not loaded"}), 500
+    return jsonify({"error": f"Model is {model_state}, try again shortly", "model": model_state}), 503
+
+def start_background_loading(preloaded=None):
+    """
+    Start database and model preparation on background threads
+    
+    Called once by the serving process (python app.py, or each worker of
+    serve.py), never at import time, so forking servers can import the app
+    without starting threads.
+    
+    Args:
+        preloaded: Optional (backend, model_path) loaded before a fork
+    """
+    threading.Thread(target=prepare_database, name="database-startup", daemon=True).start()
+    threading.Thread(target=prepare_model, args=(preloaded,), name="model-startup", daemon=True).start()
+    start_retention_gc()
+
+record_phase("app_init", process_started)
+
+# Parallel decoding of multi-image uploads
+decode_executor = ThreadPoolExecutor(max_workers=app.config['DECODE_THREADS'], thread_name_prefix="decode")
+
+def format_prediction(prediction, confidence, herb_details, db_connected, image_url, near_duplicate=False):
+    """
+    Build the JSON body returned for one predicted image
+    
+    Args:
+        prediction: Predicted class name
+        confidence: Confidence percentage
+        herb_details: Herb record the class resolves to, or None
+        db_connected: Whether the database is available
+        image_url: URL of the stored upload, or None
+        near_duplicate: Whether the result was reused from a similar earlier photo
+        
+    Returns:
+        dict: Prediction response
+    """
+    # If database is not connected, return simplified response
+    if not db_connected:
+        return {
+            "name": prediction,
+            "predicted_class": prediction,
+            "scientific": "N/A (Database not connected)",
+            "nature": "N/A",
+            "dosha": "N/A",
+            "description": "Database connection is required for detailed information.",
+            "confidence": confidence,
+            "image_url": image_url,
+            "near_duplicate": near_duplicate
+        }
+    
+    if not herb_details:
+        # Return prediction even if herb details not found
+        return {
+            "name": prediction,
+            "predicted_class": prediction,
+            "scientific": "Not found in database",
+            "nature": "Unknown",
+            "dosha": "Unknown",
+            "description": "This herb was identified but details are not available in the database.",
+            "confidence": confidence,
+            "image_url": image_url,
+            "near_duplicate": near_duplicate
+        }
+    
+    # Format response
+    return {
+        "name": herb_details["name"],
+        "predicted_class": prediction,
+        "scientific": herb_details["scientific_name"],
+        "nature": herb_details["nature"],
+        "dosha": herb_details["dosha_compatibility"],
+        "description": herb_details["description"],
+        "confidence": confidence,
+        "image_url": image_url,
+        "near_duplicate": near_duplicate
+    }
+
+def format_candidates(candidates, db_connected):
+    """
+    Build the ranked candidate list returned when top_k is requested
+    
+    Args:
+        candidates: (class_index, class_name, confidence) tuples, best first
+        db_connected: Whether the database is available
+        
+    Returns:
+        list: {"class", "herb", "confidence"} dicts (herb is None when unresolved)
+    """
+    formatted = []
+    for class_index, class_name, confidence in candidates:
+        herb = resolver.herb_for_index(class_index) if db_connected else None
+        formatted.append({
+            "class": class_name,
+            "herb": herb["name"] if herb else None,
+            "confidence": confidence
+        })
+    return formatted
+
+def receive_upload_form(endpoint):
+    """
+    Receive and parse the multipart body, recording the upload_receive stage
+    
+    Werkzeug reads the body off the socket and spools it on the first
+    access to request.files, so the stage is measured from the start of the
+    request to that point.
+    
+    Args:
+        endpoint: Endpoint label for the stage metric
+        
+    Returns:
+        MultiDict: The uploaded files (request.files)
+    """
+    files = request.files
+    PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - g.request_started, endpoint=endpoint, stage="upload_receive")
+    return files
+
+def read_batch_uploads():
+    """
+    Collect (filename, extension, bytes) for every image in a batch request
+    
+    Images may be sent as repeated 'images' multipart fields and/or as a
+    zip archive in the 'archive' field.
+    
+    Returns:
+        list: Upload tuples in request order
+    """
+    uploads = []
+    for file in request.files.getlist('images'):
+        if file.filename:
+            uploads.append((file.filename, file.filename.split('.')[-1].lower(), file.read()))
+    
+    archive = request.files.get('archive')
+    if archive is not None and archive.filename:
+        with zipfile.ZipFile(io.BytesIO(archive.read())) as zf:
+            for info in zf.infolist():
+                # Stop early so an oversized archive is never fully inflated
+                if len(uploads) > app.config['BATCH_PREDICT_MAX_IMAGES']:
+                    break
+                if info.is_dir():
+                    continue
+                extension = info.filename.split('.')[-1].lower()
+                if info.file_size > app.config['MAX_CONTENT_LENGTH']:
+                    uploads.append((info.filename, extension, None))
+                    continue
+                uploads.append((info.filename, extension, zf.read(info)))
+    
+    return uploads
+
+def result_caches():
+    """The result caches reported in metrics, as (label, cache or None) pairs"""
+    return (("prediction", prediction_cache), ("phash", phash_index), ("recommendation", recommendation_cache))
+
+# Values owned by other components are read when /api/metrics is scraped
+MODEL_STATES = ("loading", "warming", "ready", "not loaded")
+registry.gauge(
+    "ayurvignana_model_state", "Current model state (1 for the active state)",
+    lambda: [((state,), int(state == model_state)) for state in MODEL_STATES], labelnames=("state",)
+)
+registry.gauge("ayurvignana_database_connected", "Whether MongoDB is connected", lambda: [((), int(is_connected()))])
+registry.gauge("ayurvignana_herb_catalog_size", "Herbs in the in-memory catalog", lambda: [((), catalog.stats()["herbs"])])
+registry.gauge(
+    "ayurvignana_batch_queue_depth", "Images waiting for the batch scheduler",
+    lambda: [((), scheduler.stats()["queue_depth"])] if scheduler is not None else []
+)
+registry.gauge(
+    "ayurvignana_cache_entries", "Entries held by the result caches",
+    lambda: [((name,), cache.stats()["entries"]) for name, cache in result_caches() if cache is not None],
+    labelnames=("cache",)
+)
+registry.gauge(
+    "ayurvignana_cache_hit_ratio", "Hit ratio of the result caches since start",
+    lambda: [((name,), cache.stats()["hit_ratio"]) for name, cache in result_caches() if cache is not None],
+    labelnames=("cache",)
+)
+
+# Sampled requests record trace spans (see utils.tracing)
+tracer = TraceRecorder(sample_rate=app.config['TRACE_SAMPLE_RATE'], buffer_size=app.config['TRACE_BUFFER_SIZE'])
+
+def admin_authorized():
+    """Whether the request carries the configured admin token (never true if none is configured)"""
+    token = app.config['ADMIN_TOKEN']
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Admins can force a trace of a single request with "X-Trace: 1"
+    force = request.headers.get('X-Trace') == '1' and admin_authorized()
+    g.trace, g.trace_token = tracer.start_trace(f"{request.method} {request.path}", force=force)
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or "unknown"
+        status = str(response.status_code)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+    profiler.request_finished()
+    
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tracer.finish_trace(trace, g.pop('trace_token', None))
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.teardown_request
+def finish_unhandled_trace(error=None):
+    # Requests that raised never reach after_request
+    trace = g.pop('trace', None)
+    if trace is not None:
+        tracer.finish_trace(trace, g.pop('trace_token', None))
+
+@app.route('/api/admin/profile', methods=['POST'])
+def admin_profile():
+    """
+    Profile the process with the sampling profiler (requires X-Admin-Token)
+    
+    Query parameters: seconds (default 10), requests (stop after N finished
+    requests), include_idle (true/false), format (folded or json).
+    """
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), app.config['PROFILER_MAX_SECONDS'])
+        max_requests = int(request.args['requests']) if 'requests' in request.args else None
+    except ValueError:
+        return jsonify({"error": "seconds and requests must be numbers"}), 400
+    include_idle = request.args.get('include_idle', 'false').lower() == 'true'
+    
+    try:
+        profile = profiler.profile(seconds, max_requests=max_requests, include_idle=include_idle)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    
+    print(f"Profiled {profile['samples']} samples over {profile['duration_seconds']} s ({profile['requests']} requests)")
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    return Response(folded(profile), mimetype="text/plain")
+
+@app.route('/api/admin/traces', methods=['GET'])
+def admin_traces():
+    """Most recent request traces, newest first (requires X-Admin-Token)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({"sample_rate": tracer.sample_rate, "traces": tracer.recent(limit)})
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics endpoint"""
+    return Response(registry.render(), mimetype=METRICS_CONTENT_TYPE)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -67,28 +448,51 @@ def health_check():
     status = {
         "status": "healthy",
         "message": "AyurVignana API is running",
-        "database": "connected" if db is not None else "disconnected",
-        "model": "loaded" if model is not None else "not loaded"
+        "database": "connected" if is_connected() else "disconnected",
+        "herb_catalog": catalog.stats(),
+        "model": model_state,
+        "warmup_ms": warmup_timings,
+        "inference_engine": app.config['INFERENCE_ENGINE'],
+        "batching": scheduler.stats() if scheduler is not None else None,
+        "prediction_cache": prediction_cache.stats() if prediction_cache is not None else None,
+        "recommendation_cache": recommendation_cache.stats(),
+        "phash_index": phash_index.stats() if phash_index is not None else None,
+        "upload_retention": retention_stats(),
+        "schema": schema_status(),
+        "startup": {
+            "uptime_seconds": round(time.perf_counter() - process_started, 3),
+            "phases_ms": startup_phases
+        }
     }
     return jsonify(status)
 
 @app.route('/api/uploads/<filename>')
 def uploaded_file(filename):
-    """Serve uploaded files"""
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    """Serve uploaded files (with ETag, Last-Modified and Range support)"""
+    path = find_upload(filename)
+    if path is None:
+        abort(404)
+    
+    # Upload names are never reused, so clients and proxies may cache them for good
+    response = send_file(path, conditional=True, etag=True, max_age=app.config['UPLOAD_CACHE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Endpoint to predict herb from uploaded image"""
-    # Check if model is loaded
-    if model is None:
-        return jsonify({"error": "Model not loaded"}), 500
+    # Check if model is loaded and warmed up
+    unavailable = model_unavailable_response()
+    if unavailable is not None:
+        return unavailable
     
     # Check for file in request
-    if 'image' not in request.files:
+    files = receive_upload_form("predict")
+    if 'image' not in files:
         return jsonify({"error": "No image provided"}), 400
     
-    file = request.files['image']
+    file = files['image']
     if file.filename == '':
         return jsonify({"error": "No image selected"}), 400
     
@@ -99,92 +503,212 @@ def predict():
     if extension not in app.config['ALLOWED_EXTENSIONS']:
         return jsonify({"error": f"File extension '{extension}' not allowed"}), 400
     
-    # Save the uploaded image
-    try:
-        filename = f"{uuid.uuid4()}.{extension}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(file_path)
-        print(f"Saved image to {file_path}")
-    except Exception as e:
-        print(f"Error saving file: {str(e)}")
-        return jsonify({"error": f"Could not save file: {str(e)}"}), 500
+    # Read the upload into memory; prediction never touches the disk
+    image_bytes = file.read()
     
+    # Optional number of ranked candidates to return alongside the top prediction
+    top_k = request.values.get('top_k', 0, type=int) or 0
+    top_k = min(max(top_k, 0), app.config['PREDICT_TOP_K_MAX'])
+    candidates = None
+    near_duplicate = None
+    
+    # Use the shared connection pool (no per-request handshake)
+    db = get_db()
 
-    # Connect to MongoDB
+    stage = "cache_lookup"
     try:
-        client = MongoClient(app.config['MONGO_URI'])
-        db = client[app.config['MONGO_DB_NAME']]
-    
-        # Test connection
-        client.server_info()
-        print("Successfully connected to MongoDB")
-    
-        # Seed database if it's empty
-        # Fix: Use count_documents({}) > 0 instead of bool check
-        if db.herbs.count_documents({}) == 0:
-            print("Seeding database with initial data...")
-            seed_database(db)
+        # Identical bytes under the same model skip decoding and inference
+        # (ranked candidates need the full probability vector, so top_k always runs the model)
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+            cache_key = prediction_cache.key_for(image_bytes)
+            cached = prediction_cache.get(cache_key) if not top_k else None
+        if cached is not None:
+            prediction, confidence = cached
+            PREDICTIONS_TOTAL.inc(source="cache")
+        else:
+            # Decode and preprocess straight from the upload buffer
+            stage = "decode"
+            with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+                img = decode_image_bytes(image_bytes, app.config['IMG_SIZE'])
+            stage = "preprocess"
+            with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+                processed_image = prepare_image(img)
+                # Only hashed when a near-duplicate index exists (ranked requests never use it)
+                phash = dhash(img) if phash_index is not None and not top_k else None
+            
+            # A perceptually near-identical photo skips the CNN
+            near_duplicate = phash_index.lookup(phash) if phash is not None else None
+            if near_duplicate is not None:
+                # Not cached by digest, so repeats of this upload stay flagged as reused
+                prediction, confidence = near_duplicate
+                PREDICTIONS_TOTAL.inc(source="phash")
+            else:
+                stage = "inference"
+                with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+                    if top_k:
+                        candidates = scheduler.predict_top_k(processed_image, top_k, timeout=app.config['PREDICT_TIMEOUT'])
+                        prediction, confidence = candidates[0][1:]
+                    else:
+                        prediction, confidence = scheduler.predict(processed_image, timeout=app.config['PREDICT_TIMEOUT'])
+                PREDICTIONS_TOTAL.inc(source="model")
+                if phash is not None:
+                    phash_index.add(phash, (prediction, confidence))
+                prediction_cache.put(cache_key, (prediction, confidence))
         
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {str(e)}")
-        print("Starting app without database connection.")
-        db = None
-
-    try:
-        # Preprocess image and predict
-        processed_image = preprocess_image(file_path)
-        prediction, confidence = predict_herb(model, processed_image)
+        # Persisting the original is optional; the write overlaps the herb lookup
+        pending_upload = save_upload(image_bytes, extension) if app.config['SAVE_UPLOADS'] else None
         
         print(f"Predicted herb: {prediction} with confidence {confidence}%")
         
-        # If database is not connected, return simplified response
-        if db is None:
-            return jsonify({
-                "name": prediction,
-                "scientific": "N/A (Database not connected)",
-                "nature": "N/A",
-                "dosha": "N/A",
-                "description": "Database connection is required for detailed information.",
-                "confidence": confidence,
-                "image_url": f"/api/uploads/{filename}"
-            })
+        # Get herb details from the catalog (skipped when the database is down)
+        stage = "herb_lookup"
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+            herb_details = get_herb_for_class(db, prediction) if db is not None else None
         
-        # Get herb details from database
-        herb_details = get_herb_by_name(db, prediction)
+        # The file must exist before its URL is handed out
+        image_url = None
+        if pending_upload is not None:
+            stage = "file_save"
+            with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+                filename = wait_for_upload(pending_upload, app.config['UPLOAD_WRITE_TIMEOUT'])
+            image_url = f"/api/uploads/{filename}" if filename else None
         
-        if not herb_details:
-            # Return prediction even if herb details not found
-            return jsonify({
-                "name": prediction,
-                "scientific": "Not found in database",
-                "nature": "Unknown",
-                "dosha": "Unknown",
-                "description": "This herb was identified but details are not available in the database.",
-                "confidence": confidence,
-                "image_url": f"/api/uploads/{filename}"
-            })
-        
-        # Format response
-        response = {
-            "name": herb_details["name"],
-            "scientific": herb_details["scientific_name"],
-            "nature": herb_details["nature"],
-            "dosha": herb_details["dosha_compatibility"],
-            "description": herb_details["description"],
-            "confidence": confidence,
-            "image_url": f"/api/uploads/{filename}"
-        }
-        
-        return jsonify(response)
+        stage = "serialize"
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage=stage):
+            result = format_prediction(prediction, confidence, herb_details, db is not None, image_url,
+                                       near_duplicate=near_duplicate is not None)
+            if candidates is not None:
+                result["candidates"] = format_candidates(candidates, db is not None)
+            return jsonify(result)
     
     except Exception as e:
+        ERRORS_TOTAL.inc(endpoint="predict", stage=stage)
         print(f"Error during prediction: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Endpoint to predict herbs for many images in one request"""
+    # Check if model is loaded and warmed up
+    unavailable = model_unavailable_response()
+    if unavailable is not None:
+        return unavailable
+    
+    try:
+        receive_upload_form("predict_batch")
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="upload_unpack"):
+            uploads = read_batch_uploads()
+    except zipfile.BadZipFile:
+        return jsonify({"error": "Archive is not a valid zip file"}), 400
+    
+    if not uploads:
+        return jsonify({"error": "No images provided"}), 400
+    if len(uploads) > app.config['BATCH_PREDICT_MAX_IMAGES']:
+        return jsonify({"error": f"Too many images (max {app.config['BATCH_PREDICT_MAX_IMAGES']})"}), 400
+    
+    print(f"Received batch of {len(uploads)} images")
+    
+    results = [{"index": index, "filename": filename} for index, (filename, _, _) in enumerate(uploads)]
+    
+    # Decode and preprocess in parallel; failures are reported per image
+    def decode(upload):
+        filename, extension, image_bytes = upload
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="decode"):
+            img = decode_image_bytes(image_bytes, app.config['IMG_SIZE'])
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="preprocess"):
+            return prepare_image(img), dhash(img) if phash_index is not None else None
+    
+    # Images seen before are answered from the result cache
+    predicted = {}
+    reused = set()
+    cache_keys = {}
+    futures = {}
+    for index, (_, extension, image_bytes) in enumerate(uploads):
+        # Rejected before the cache lookup, as in /api/predict
+        error = None
+        if extension not in app.config['ALLOWED_EXTENSIONS']:
+            error = f"File extension '{extension}' not allowed"
+        elif image_bytes is None:
+            error = "File is too large"
+        if error is not None:
+            ERRORS_TOTAL.inc(endpoint="predict_batch", stage="decode")
+            results[index]["error"] = error
+            continue
+        cache_keys[index] = prediction_cache.key_for(image_bytes)
+        cached = prediction_cache.get(cache_keys[index])
+        if cached is not None:
+            predicted[index] = cached
+            PREDICTIONS_TOTAL.inc(source="cache")
+            continue
+        futures[index] = decode_executor.submit(decode, uploads[index])
+    
+    decoded = []
+    for index, future in futures.items():
+        try:
+            image, phash = future.result()
+        except Exception as e:
+            ERRORS_TOTAL.inc(endpoint="predict_batch", stage="decode")
+            results[index]["error"] = str(e)
+            continue
+        
+        # Near-duplicates of earlier photos skip the CNN
+        near_duplicate = phash_index.lookup(phash) if phash is not None else None
+        if near_duplicate is not None:
+            predicted[index] = near_duplicate
+            reused.add(index)
+            PREDICTIONS_TOTAL.inc(source="phash")
+        else:
+            decoded.append((index, image, phash))
+    
+    if decoded:
+        try:
+            batch = np.concatenate([image for _, image, _ in decoded], axis=0)
+            with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="inference"):
+                predictions = scheduler.predict_many(batch, timeout=app.config['PREDICT_TIMEOUT'])
+            PREDICTIONS_TOTAL.inc(len(predictions), source="model")
+            for (index, _, phash), result in zip(decoded, predictions):
+                predicted[index] = result
+                prediction_cache.put(cache_keys[index], result)
+                if phash is not None:
+                    phash_index.add(phash, result)
+        except Exception as e:
+            ERRORS_TOTAL.inc(endpoint="predict_batch", stage="inference")
+            print(f"Error during batch prediction: {str(e)}")
+            for index, _, _ in decoded:
+                results[index]["error"] = str(e)
+    
+    # Resolve every predicted herb with one bulk catalog lookup
+    db = get_db()
+    with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="herb_lookup"):
+        herbs = get_herbs_for_classes(db, {name for name, _ in predicted.values()}) if db is not None else {}
+    
+    # Start every write, then wait for them all before handing out URLs
+    pending_uploads = {}
+    if app.config['SAVE_UPLOADS']:
+        for index in predicted:
+            _, extension, image_bytes = uploads[index]
+            pending_uploads[index] = save_upload(image_bytes, extension)
+    
+    for index in sorted(predicted):
+        prediction, confidence = predicted[index]
+        image_url = None
+        if index in pending_uploads:
+            filename = wait_for_upload(pending_uploads[index], app.config['UPLOAD_WRITE_TIMEOUT'])
+            image_url = f"/api/uploads/{filename}" if filename else None
+        results[index].update(format_prediction(
+            prediction, confidence, herbs.get(prediction), db is not None, image_url, near_duplicate=index in reused
+        ))
+    
+    errors = sum(1 for result in results if "error" in result)
+    print(f"Batch prediction finished with {errors} errors")
+    with PIPELINE_STAGE_SECONDS.time(endpoint="predict_batch", stage="serialize"):
+        return jsonify({"results": results, "count": len(results), "errors": errors})
+
 @app.route('/api/recommend', methods=['POST'])
 def recommend():
     """Endpoint to get herb recommendations based on symptoms"""
     # Check database connection
+    db = get_db()
     if db is None:
         return jsonify({
             "error": "Database not connected",
@@ -204,18 +728,21 @@ def recommend():
     
     try:
         # Get recommendations from database
-        recommendations = get_recommendations_by_symptoms(db, symptoms)
+        with PIPELINE_STAGE_SECONDS.time(endpoint="recommend", stage="herb_lookup"):
+            recommendations = get_recommendations_by_symptoms(db, symptoms)
         
         print(f"Found {len(recommendations)} recommendations")
-        return jsonify({"recommendations": recommendations})
+        with PIPELINE_STAGE_SECONDS.time(endpoint="recommend", stage="serialize"):
+            return jsonify({"recommendations": recommendations})
     
     except Exception as e:
+        ERRORS_TOTAL.inc(endpoint="recommend", stage="herb_lookup")
         print(f"Error getting recommendations: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
     # Set environment variables
-    os.environ['FLASK_ENV'] = 'development'
+    os.environ['FLASK_ENV'] = app.config['PROFILE']
     
     # Configure logging
     import logging
@@ -224,15 +751,19 @@ if __name__ == '__main__':
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     )
     
+    # The reloader's watcher process never serves requests, so only the serving process loads anything
+    if not app.config['USE_RELOADER'] or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_loading()
+    
     print("Starting AyurVignana API server...")
-    print(f"API will be available at: http://localhost:5000/api")
-    print(f"Health check endpoint: http://localhost:5000/api/health")
+    print(f"API will be available at: http://localhost:{app.config['PORT']}/api")
+    print(f"Health check endpoint: http://localhost:{app.config['PORT']}/api/health")
     
     # Run the app
     app.run(
-        debug=True,
-        host='0.0.0.0',
-        port=5000,
-        use_reloader=True,
+        debug=app.config['DEBUG'],
+        host=app.config['HOST'],
+        port=app.config['PORT'],
+        use_reloader=app.config['USE_RELOADER'],
         threaded=True
     )
\ No newline at end of file
@@ -0,0 +1,400 @@
+"""
+ASGI variant of the AyurVignana API.
+
+Serves the same /api/predict, /api/recommend and /api/health contracts as
+app.py from an asyncio event loop, so slow clients hold a coroutine rather
+than a thread. MongoDB is reached through Motor, herb lookups come from the
+shared in-memory catalog, and blocking work is offloaded: image decoding
+runs on the decode pool of app.py and waits on the batch scheduler run on a
+bounded inference pool. Predictions beyond ASYNC_MAX_CONCURRENT_PREDICTIONS
+queue on the event loop instead of spawning threads.
+
+Model loading, warmup, the batch scheduler and the result caches are the
+ones from app.py, so both servers behave identically.
+
+Usage:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from quart import Quart, Response, abort, g, jsonify, request, send_file
+from quart_cors import cors
+
+import app as api
+from config import Config
+from services import async_db_service, db_service
+from services.async_herb_service import (
+    get_herb_for_class, get_recommendations_by_symptoms, load_catalog, load_matcher, seed_database, watch_collection
+)
+from services.herb_catalog import catalog
+from services.herb_resolver import resolver
+from services.migrations import run_startup_migrations, schema_status
+from services.metrics import (
+    ERRORS_TOTAL, METRICS_CONTENT_TYPE, PIPELINE_STAGE_SECONDS, PREDICTIONS_TOTAL, REQUEST_SECONDS, REQUESTS_TOTAL, registry
+)
+from services.profiler import folded, profiler
+from services.recommendation_cache import recommendation_cache
+from services.symptom_matcher import matcher
+from services.upload_storage import find_upload, retention_stats, save_upload, start_retention_gc, wait_for_upload
+from utils.image_utils import decode_image_bytes, dhash, prepare_image
+
+# Initialize Quart app
+app = Quart(__name__)
+# Enable CORS for all routes and origins
+app = cors(app, allow_origin="*")
+
+# Load configuration
+app.config.from_object(Config)
+
+# Created per serving process in startup(), never at import time
+inference_executor = None
+prediction_slots = None
+background_tasks = set()
+
+def migrate_database():
+    """Run the index migrations with a short-lived PyMongo client (blocking; runs on a worker thread)"""
+    db = db_service.connect()
+    if db is None:
+        return
+    try:
+        run_startup_migrations(db)
+    finally:
+        db_service.close()
+
+async def prepare_database():
+    """Connect with Motor, migrate, seed once, load the in-memory indexes and watch for changes"""
+    started = time.perf_counter()
+    db = await async_db_service.connect()
+    api.record_phase("database_connect", started)
+    if db is None:
+        print("Starting app without database connection.")
+        return
+
+    try:
+        if app.config['MIGRATE_ON_STARTUP']:
+            started = time.perf_counter()
+            await asyncio.get_running_loop().run_in_executor(None, migrate_database)
+            api.record_phase("database_migrate", started)
+
+        started = time.perf_counter()
+        await seed_database(db)
+        api.record_phase("database_seed", started)
+
+        started = time.perf_counter()
+        await load_catalog(db)
+        resolver.build()
+        await load_matcher(db)
+        api.record_phase("catalog_load", started)
+
+        for collection, on_change in ((db.herbs, catalog.invalidate), (db.recommendations, matcher.invalidate)):
+            task = asyncio.ensure_future(watch_collection(collection, on_change))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+    except Exception as e:
+        print(f"Error preparing database: {str(e)}")
+
+@app.before_serving
+async def startup():
+    """Start model preparation on a thread and database preparation on the event loop"""
+    global inference_executor, prediction_slots
+
+    inference_executor = ThreadPoolExecutor(max_workers=app.config['ASYNC_INFERENCE_THREADS'], thread_name_prefix="inference-wait")
+    prediction_slots = asyncio.Semaphore(app.config['ASYNC_MAX_CONCURRENT_PREDICTIONS'])
+
+    threading.Thread(target=api.prepare_model, name="model-startup", daemon=True).start()
+    start_retention_gc()
+    task = asyncio.ensure_future(prepare_database())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+@app.after_serving
+async def shutdown():
+    """Release the Motor pool and the inference pool"""
+    for task in list(background_tasks):
+        task.cancel()
+    async_db_service.close()
+    if inference_executor is not None:
+        inference_executor.shutdown(wait=False)
+
+def model_unavailable_response():
+    """Error response for prediction routes while the model is not ready (None when ready)"""
+    if api.model_state == "ready":
+        return None
+    if api.model_state == "not loaded":
+        return jsonify({"error": "Model not loaded"}), 500
+    return jsonify({"error": f"Model is {api.model_state}, try again shortly", "model": api.model_state}), 503
+
+def decode_upload(image_bytes, with_hash):
+    """Decode and preprocess an upload, hashing it if asked (runs on the decode pool)"""
+    with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage="decode"):
+        img = decode_image_bytes(image_bytes, Config.IMG_SIZE)
+    with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage="preprocess"):
+        return prepare_image(img), dhash(img) if with_hash else None
+
+async def classify(image_bytes, top_k=0):
+    """
+    Classify one upload, using the result caches and offloading blocking work
+
+    Args:
+        image_bytes: Raw bytes of the uploaded image
+        top_k: Number of ranked candidates wanted (0 for none); ranking
+            needs the full probability vector, so it always runs the model
+
+    Returns:
+        tuple: (predicted_class_name, confidence_percentage, candidates or None,
+            whether the result was reused from a near-duplicate photo)
+    """
+    loop = asyncio.get_running_loop()
+
+    # Identical bytes under the same model skip decoding and inference
+    cache_key = api.prediction_cache.key_for(image_bytes)
+    cached = api.prediction_cache.get(cache_key) if not top_k else None
+    if cached is not None:
+        PREDICTIONS_TOTAL.inc(source="cache")
+        return cached + (None, False)
+
+    candidates = None
+    async with prediction_slots:
+        # Only hashed when a near-duplicate index exists (ranked requests never use it)
+        with_hash = api.phash_index is not None and not top_k
+        processed_image, phash = await loop.run_in_executor(api.decode_executor, decode_upload, image_bytes, with_hash)
+
+        # A perceptually near-identical photo skips the CNN
+        near_duplicate = api.phash_index.lookup(phash) if phash is not None else None
+        if near_duplicate is not None:
+            # Not cached by digest, so repeats of this upload stay flagged as reused
+            PREDICTIONS_TOTAL.inc(source="phash")
+            return near_duplicate + (None, True)
+
+        started = time.perf_counter()
+        if top_k:
+            candidates = await loop.run_in_executor(
+                inference_executor,
+                lambda: api.scheduler.predict_top_k(processed_image, top_k, timeout=app.config['PREDICT_TIMEOUT'])
+            )
+            result = tuple(candidates[0][1:])
+        else:
+            result = await loop.run_in_executor(
+                inference_executor,
+                lambda: api.scheduler.predict(processed_image, timeout=app.config['PREDICT_TIMEOUT'])
+            )
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, endpoint="predict", stage="inference")
+        PREDICTIONS_TOTAL.inc(source="model")
+        if phash is not None:
+            api.phash_index.add(phash, result)
+
+    api.prediction_cache.put(cache_key, result)
+    return result + (candidates, False)
+
+def admin_authorized():
+    """Whether the request carries the configured admin token (never true if none is configured)"""
+    token = app.config['ADMIN_TOKEN']
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(token) and hmac.compare_digest(supplied.encode(), token.encode())
+
+@app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Admins can force a trace of a single request with "X-Trace: 1"
+    force = request.headers.get('X-Trace') == '1' and admin_authorized()
+    g.trace, g.trace_token = api.tracer.start_trace(f"{request.method} {request.path}", force=force)
+
+@app.after_request
+async def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or "unknown"
+        status = str(response.status_code)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, status=status)
+        REQUESTS_TOTAL.inc(endpoint=endpoint, status=status)
+    profiler.request_finished()
+
+    trace = g.pop('trace', None)
+    if trace is not None:
+        api.tracer.finish_trace(trace, g.pop('trace_token', None))
+        response.headers['X-Trace-Id'] = trace.trace_id
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+@app.route('/api/admin/profile', methods=['POST'])
+async def admin_profile():
+    """Profile the process with the sampling profiler (requires X-Admin-Token, see app.py)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), app.config['PROFILER_MAX_SECONDS'])
+        max_requests = int(request.args['requests']) if 'requests' in request.args else None
+    except ValueError:
+        return jsonify({"error": "seconds and requests must be numbers"}), 400
+    include_idle = request.args.get('include_idle', 'false').lower() == 'true'
+
+    # Sampling blocks, so it runs off the event loop while requests keep flowing
+    loop = asyncio.get_running_loop()
+    try:
+        profile = await loop.run_in_executor(
+            None, lambda: profiler.profile(seconds, max_requests=max_requests, include_idle=include_idle)
+        )
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+
+    if request.args.get('format') == 'json':
+        return jsonify(profile)
+    return Response(folded(profile), mimetype="text/plain")
+
+@app.route('/api/admin/traces', methods=['GET'])
+async def admin_traces():
+    """Most recent request traces, newest first (requires X-Admin-Token)"""
+    if not admin_authorized():
+        return jsonify({"error": "Admin token required"}), 403
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({"sample_rate": api.tracer.sample_rate, "traces": api.tracer.recent(limit)})
+
+@app.route('/api/metrics', methods=['GET'])
+async def metrics():
+    """Prometheus metrics endpoint (gauges are registered by app.py)"""
+    return Response(registry.render(), mimetype=METRICS_CONTENT_TYPE)
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint"""
+    status = {
+        "status": "healthy",
+        "message": "AyurVignana API is running (async)",
+        "database": "connected" if async_db_service.is_connected() else "disconnected",
+        "herb_catalog": catalog.stats(),
+        "model": api.model_state,
+        "warmup_ms": api.warmup_timings,
+        "inference_engine": app.config['INFERENCE_ENGINE'],
+        "batching": api.scheduler.stats() if api.scheduler is not None else None,
+        "prediction_cache": api.prediction_cache.stats() if api.prediction_cache is not None else None,
+        "recommendation_cache": recommendation_cache.stats(),
+        "phash_index": api.phash_index.stats() if api.phash_index is not None else None,
+        "upload_retention": retention_stats(),
+        "schema": schema_status(),
+        "startup": {
+            "uptime_seconds": round(time.perf_counter() - api.process_started, 3),
+            "phases_ms": api.startup_phases
+        }
+    }
+    return jsonify(status)
+
+@app.route('/api/uploads/<filename>')
+async def uploaded_file(filename):
+    """Serve uploaded files (with ETag, Last-Modified and Range support)"""
+    path = find_upload(filename)
+    if path is None:
+        abort(404)
+
+    # Upload names are never reused, so clients and proxies may cache them for good
+    response = await send_file(path, conditional=True, etag=True, max_age=app.config['UPLOAD_CACHE_MAX_AGE'])
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/predict', methods=['POST'])
+async def predict():
+    """Endpoint to predict herb from uploaded image"""
+    # Check if model is loaded and warmed up
+    unavailable = model_unavailable_response()
+    if unavailable is not None:
+        return unavailable
+
+    # The body is received without holding a thread, however slow the client;
+    # the stage covers the request from its start until the form is parsed
+    files = await request.files
+    PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - g.request_started, endpoint="predict", stage="upload_receive")
+    if 'image' not in files:
+        return jsonify({"error": "No image provided"}), 400
+
+    file = files['image']
+    if file.filename == '':
+        return jsonify({"error": "No image selected"}), 400
+
+    print(f"Received image: {file.filename}")
+
+    # Check file extension
+    extension = file.filename.split('.')[-1].lower()
+    if extension not in app.config['ALLOWED_EXTENSIONS']:
+        return jsonify({"error": f"File extension '{extension}' not allowed"}), 400
+
+    image_bytes = file.read()
+
+    # Optional number of ranked candidates to return alongside the top prediction
+    values = await request.values
+    top_k = values.get('top_k', 0, type=int) or 0
+    top_k = min(max(top_k, 0), app.config['PREDICT_TOP_K_MAX'])
+
+    try:
+        prediction, confidence, candidates, near_duplicate = await classify(image_bytes, top_k)
+
+        # Persisting the original is optional; the write runs off the event loop
+        # and finishes before the URL is handed out
+        image_url = None
+        if app.config['SAVE_UPLOADS']:
+            filename = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: wait_for_upload(save_upload(image_bytes, extension), app.config['UPLOAD_WRITE_TIMEOUT'])
+            )
+            image_url = f"/api/uploads/{filename}" if filename else None
+
+        print(f"Predicted herb: {prediction} with confidence {confidence}%")
+
+        # Get herb details from the catalog (skipped when the database is down)
+        started = time.perf_counter()
+        db = await async_db_service.get_db()
+        herb_details = await get_herb_for_class(db, prediction) if db is not None else None
+        PIPELINE_STAGE_SECONDS.observe(time.perf_counter() - started, endpoint="predict", stage="herb_lookup")
+
+        with PIPELINE_STAGE_SECONDS.time(endpoint="predict", stage="serialize"):
+            result = api.format_prediction(prediction, confidence, herb_details, db is not None, image_url,
+                                           near_duplicate=near_duplicate)
+            if candidates is not None:
+                result["candidates"] = api.format_candidates(candidates, db is not None)
+            return jsonify(result)
+
+    except Exception as e:
+        ERRORS_TOTAL.inc(endpoint="predict", stage="pipeline")
+        print(f"Error during prediction: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/recommend', methods=['POST'])
+async def recommend():
+    """Endpoint to get herb recommendations based on symptoms"""
+    # Check database connection
+    db = await async_db_service.get_db()
+    if db is None:
+        return jsonify({
+            "error": "Database not connected",
+            "recommendations": []
+        }), 500
+
+    # Check request data
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = await request.get_json()
+    if not data or 'symptoms' not in data:
+        return jsonify({"error": "No symptoms provided"}), 400
+
+    symptoms = data['symptoms'].lower()
+    print(f"Searching recommendations for symptoms: {symptoms}")
+
+    try:
+        recommendations = await get_recommendations_by_symptoms(db, symptoms)
+
+        print(f"Found {len(recommendations)} recommendations")
+        return jsonify({"recommendations": recommendations})
+
+    except Exception as e:
+        print(f"Error getting recommendations: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+if __name__ == '__main__':
+    print("Starting AyurVignana async API server...")
+    print(f"API will be available at: http://localhost:{app.config['PORT']}/api")
+    app.run(host=app.config['HOST'], port=app.config['PORT'], debug=app.config['DEBUG'], use_reloader=False)
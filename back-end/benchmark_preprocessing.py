@@ -0,0 +1,237 @@
+"""
+Micro-benchmark of image preprocessing.
+
+Compares three ways of turning an encoded photo into a (1, 150, 150, 3)
+model input:
+
+    legacy   full-resolution decode, resize, cvtColor, astype, /255 and
+             expand_dims, each allocating a new array (the previous float32 path)
+    fused    full-resolution decode, then utils.image_utils.prepare_image
+             writing uint8 pixels into a reused batch buffer (normalization
+             runs inside the model graph)
+    reduced  as fused, but large JPEGs are decoded at 1/2, 1/4 or 1/8 scale
+
+For each input size it reports the median time per image, the peak memory
+allocated by one call and how far the normalized output strays from the
+legacy tensor.
+Synthetic JPEGs are generated unless real photos are given with --images.
+
+The variants the server actually uses (fused, plus reduced when
+REDUCED_DECODE is on) are checked against the legacy tensor: their largest
+difference must stay within --max-diff, and with --model the predicted
+class must agree with the legacy input's on at least --min-agreement of
+the images. The script exits with status 1 if a check fails. Top-1
+agreement is only meaningful on real photos.
+
+Usage:
+    python benchmark_preprocessing.py
+    python benchmark_preprocessing.py --sizes 4032x3024,1920x1080 --repeat 50
+    python benchmark_preprocessing.py --images ./samples --json preprocessing.json
+    python benchmark_preprocessing.py --images ./samples --model AyurVignana_prediction_cnn_.onnx --check reduced
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from config import Config
+from utils.image_utils import decode_image_bytes, float_to_pixels, new_batch, pixels_to_float, prepare_image
+
+IMAGE_EXTENSIONS = tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS)
+DEFAULT_SIZES = "4032x3024,3000x2000,1920x1080,1024x768,640x480"
+
+def legacy_preprocess(image_bytes, out=None):
+    """The float32 preprocessing path as it was before (out is ignored: it always allocated)"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    img = cv2.resize(img, Config.IMG_SIZE)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    img = img.astype(np.float32) / 255.0
+    return np.expand_dims(img, axis=0)
+
+def fused_preprocess(image_bytes, out=None):
+    return prepare_image(decode_image_bytes(image_bytes), out)
+
+def reduced_preprocess(image_bytes, out=None):
+    return prepare_image(decode_image_bytes(image_bytes, Config.IMG_SIZE), out)
+
+VARIANTS = (("legacy", legacy_preprocess), ("fused", fused_preprocess), ("reduced", reduced_preprocess))
+
+# Largest tolerated difference from the legacy tensor (rounding only: the
+# serving path must feed the model the pixels it was validated with)
+DEFAULT_MAX_DIFF = 1e-6
+DEFAULT_MIN_AGREEMENT = 0.99
+
+def served_variants():
+    """Variants the server uses with the current configuration"""
+    return ["fused", "reduced"] if Config.REDUCED_DECODE else ["fused"]
+
+def synthetic_jpeg(width, height, quality=90):
+    """
+    Encode a photo-like test image (smooth gradients plus sensor-style noise)
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        quality: JPEG quality
+
+    Returns:
+        bytes: Encoded JPEG
+    """
+    rng = np.random.default_rng(width * 31 + height)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    img = np.empty((height, width, 3), dtype=np.float32)
+    img[:, :, 0] = 128 + 100 * np.sin(x / (width / 7.0))
+    img[:, :, 1] = 128 + 100 * np.cos(y / (height / 5.0))
+    img[:, :, 2] = 255 * (x + y) / (width + height)
+    img += rng.normal(0, 12, img.shape).astype(np.float32)
+    ok, encoded = cv2.imencode(".jpg", np.clip(img, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise RuntimeError("Could not encode synthetic JPEG")
+    return encoded.tobytes()
+
+def load_inputs(args):
+    """Return (label, image bytes) pairs for every input to benchmark"""
+    if args.images:
+        inputs = []
+        for directory in args.images:
+            for name in sorted(os.listdir(directory)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    with open(os.path.join(directory, name), "rb") as f:
+                        inputs.append((name, f.read()))
+        return inputs
+
+    inputs = []
+    for size in args.sizes.split(","):
+        width, height = (int(value) for value in size.lower().split("x"))
+        inputs.append((f"{width}x{height}", synthetic_jpeg(width, height)))
+    return inputs
+
+def measure(func, image_bytes, repeat):
+    """
+    Time one preprocessing variant on one image
+
+    Args:
+        func: Preprocessing function taking (image_bytes, out)
+        image_bytes: Encoded image
+        repeat: Number of timed calls
+
+    Returns:
+        dict: Median and minimum milliseconds, peak allocation and the output
+    """
+    out = new_batch(1)
+    result = pixels_to_float(func(image_bytes, out))  # warm-up (scratch buffers, codec tables)
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(image_bytes, out)
+        timings.append((time.perf_counter() - started) * 1000.0)
+
+    # NumPy reports its allocations to tracemalloc; OpenCV's own are not seen
+    tracemalloc.start()
+    func(image_bytes, out)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "peak_alloc_kb": peak / 1024.0,
+        "output": result,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image preprocessing")
+    parser.add_argument("--images", nargs="+", help="Directories of real photos (default: synthetic JPEGs)")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Synthetic image sizes as WxH,WxH,...")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed calls per image and variant")
+    parser.add_argument("--threads", type=int, default=1, help="OpenCV threads (1 matches a decode pool worker)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--check", nargs="+", choices=[name for name, _ in VARIANTS[1:]],
+                        help="Variants to check against legacy (default: those the server uses)")
+    parser.add_argument("--max-diff", type=float, default=DEFAULT_MAX_DIFF,
+                        help="Largest tolerated difference from the legacy tensor")
+    parser.add_argument("--model", help="Model file to measure top-1 agreement with (any inference engine)")
+    parser.add_argument("--engine", default="auto", help="Inference engine for --model")
+    parser.add_argument("--min-agreement", type=float, default=DEFAULT_MIN_AGREEMENT,
+                        help="Smallest tolerated top-1 agreement with legacy (with --model)")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    inputs = load_inputs(args)
+    if not inputs:
+        print("No images to benchmark")
+        return 1
+
+    checked = args.check or served_variants()
+    backend = None
+    if args.model:
+        from services.prediction_service import load_inference_backend, predict_probabilities
+        backend = load_inference_backend(args.engine, args.model)
+    predictions = {name: [] for name, _ in VARIANTS}
+
+    rows = []
+    header = f"{'image':<24}" + "".join(f"{name + ' ms':>12}{'KB':>9}" for name, _ in VARIANTS) + f"{'speedup':>9}{'max diff':>10}"
+    print(header)
+    print("-" * len(header))
+    for label, image_bytes in inputs:
+        results = {name: measure(func, image_bytes, args.repeat) for name, func in VARIANTS}
+        reference = results["legacy"]["output"]
+        row = {"image": label, "bytes": len(image_bytes)}
+        line = f"{label[:23]:<24}"
+        for name, _ in VARIANTS:
+            result = results[name]
+            row[name] = {
+                "median_ms": round(result["median_ms"], 3),
+                "min_ms": round(result["min_ms"], 3),
+                "peak_alloc_kb": round(result["peak_alloc_kb"], 1),
+                "max_abs_diff": float(np.abs(result["output"] - reference).max()),
+            }
+            line += f"{result['median_ms']:>12.2f}{result['peak_alloc_kb']:>9.0f}"
+        row["speedup"] = round(results["legacy"]["median_ms"] / results["reduced"]["median_ms"], 2)
+        line += f"{row['speedup']:>8.1f}x{row['reduced']['max_abs_diff']:>10.3f}"
+        print(line)
+        rows.append(row)
+
+        if backend is not None:
+            for name, _ in VARIANTS:
+                # The backends take uint8 pixels; the legacy floats are exact multiples of 1/255
+                pixels = float_to_pixels(results[name]["output"])
+                predictions[name].append(int(np.argmax(predict_probabilities(backend, pixels)[0])))
+
+    failures = []
+    checks = {}
+    for name in checked:
+        worst = max(row[name]["max_abs_diff"] for row in rows)
+        checks[name] = {"max_abs_diff": worst}
+        if worst > args.max_diff:
+            failures.append(f"{name}: max difference {worst:.4f} from legacy exceeds {args.max_diff:g}")
+        if backend is not None:
+            agreement = sum(a == b for a, b in zip(predictions[name], predictions["legacy"])) / len(rows)
+            checks[name]["top1_agreement"] = agreement
+            if agreement < args.min_agreement:
+                failures.append(f"{name}: top-1 agreement {agreement:.2%} with legacy is below {args.min_agreement:.2%}")
+
+    print()
+    for name, check in checks.items():
+        agreement = check.get("top1_agreement")
+        print(f"{name}: max difference {check['max_abs_diff']:.4f}, top-1 agreement "
+              f"{'not measured (pass --model)' if agreement is None else f'{agreement:.2%} of {len(rows)} images'}")
+    for failure in failures:
+        print(f"FAILED {failure}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"threads": args.threads, "repeat": args.repeat, "results": rows,
+                       "checks": checks, "failures": failures}, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""
+Offline bulk classification of herb photos.
+
+Streams image paths from directories and/or list files, decodes and
+resizes them in a pool of processes, feeds fixed-size batches to the model
+while the next batches are still being decoded, and appends one result per
+image to a JSONL or CSV file as it goes.
+
+Runs are resumable: images already present in the output file are skipped,
+so an interrupted run continues where it stopped when started again.
+
+Usage:
+    python bulk_classify.py ./survey_photos --output results.jsonl
+    python bulk_classify.py photos.txt --output results.csv --batch-size 64
+    python bulk_classify.py ./photos --output results.jsonl --restart
+"""
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from config import Config
+from services.prediction_service import load_inference_backend, predict_herbs
+from utils.image_utils import new_batch, preprocess_image_bytes
+
+IMAGE_EXTENSIONS = tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS)
+CSV_FIELDS = ["path", "prediction", "confidence", "error"]
+# Seconds between progress reports
+PROGRESS_INTERVAL = 5.0
+
+def iter_image_paths(inputs):
+    """
+    Lazily list images from directories (recursively) and list files
+
+    Args:
+        inputs: Directory paths, image paths, or text files with one path per line
+
+    Yields:
+        str: Image path
+    """
+    for source in inputs:
+        if os.path.isdir(source):
+            stack = [source]
+            while stack:
+                directory = stack.pop()
+                with os.scandir(directory) as entries:
+                    names = sorted(entries, key=lambda entry: entry.name)
+                for entry in names:
+                    if entry.is_dir():
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield entry.path
+        elif source.lower().endswith(IMAGE_EXTENSIONS):
+            yield source
+        else:
+            with open(source) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        yield line
+
+def iter_batches(paths, batch_size, skip):
+    """Group paths into lists of batch_size, leaving out those in skip"""
+    batch = []
+    for path in paths:
+        if path in skip:
+            continue
+        batch.append(path)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _init_decoder():
+    # Each process decodes one image at a time; parallelism comes from the pool
+    import cv2
+    cv2.setNumThreads(1)
+
+def decode_batch(paths):
+    """
+    Decode and preprocess a batch of images (runs in a pool process)
+
+    Args:
+        paths: Image paths
+
+    Returns:
+        tuple: (stacked images or None, paths that decoded, {path: error})
+    """
+    # Images are preprocessed straight into their row of the batch
+    batch = new_batch(len(paths))
+    decoded = []
+    errors = {}
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                row = len(decoded)
+                preprocess_image_bytes(f.read(), out=batch[row:row + 1])
+            decoded.append(path)
+        except Exception as e:
+            errors[path] = str(e)
+
+    batch = batch[:len(decoded)] if decoded else None
+    return batch, decoded, errors
+
+def output_format(path, requested=None):
+    """Pick 'jsonl' or 'csv' from an explicit choice or the output file extension"""
+    if requested:
+        return requested
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def read_completed(path, fmt):
+    """
+    Collect the images already classified in an existing output file
+
+    A trailing partial line left by an interrupted run is cut off so new
+    results are appended cleanly.
+
+    Args:
+        path: Output file
+        fmt: 'jsonl' or 'csv'
+
+    Returns:
+        set: Paths already present in the output
+    """
+    if not os.path.exists(path):
+        return set()
+
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    completed = set()
+    with open(path, newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                completed.add(row["path"])
+        else:
+            for line in f:
+                try:
+                    completed.add(json.loads(line)["path"])
+                except (ValueError, KeyError):
+                    continue
+    return completed
+
+class ResultWriter:
+    """
+    Appends classification results to a JSONL or CSV file
+
+    Args:
+        path: Output file
+        fmt: 'jsonl' or 'csv'
+    """
+
+    def __init__(self, path, fmt):
+        self.fmt = fmt
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", newline="")
+        self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS) if fmt == "csv" else None
+        if self._csv is not None and new_file:
+            self._csv.writeheader()
+
+    def write(self, row):
+        if self._csv is not None:
+            self._csv.writerow({field: row.get(field, "") for field in CSV_FIELDS})
+        else:
+            self._file.write(json.dumps(row) + "\n")
+
+    def flush(self):
+        # Flushed after every batch so an interruption loses at most one batch
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+def classify(args):
+    """
+    Run a bulk classification job
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        dict: Run summary
+    """
+    fmt = output_format(args.output, args.format)
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
+    completed = read_completed(args.output, fmt)
+    if completed:
+        print(f"Resuming: {len(completed)} images already classified in {args.output}")
+
+    # Spawned rather than forked, so decoders never inherit the loaded model
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_decoder
+    )
+
+    # Under XLA the last, partial batch is padded instead of compiling another shape
+    backend = load_inference_backend(args.engine, args.model, batch_sizes=[args.batch_size])
+    print(f"Model loaded from {args.model or Config.MODEL_PATH}")
+
+    writer = ResultWriter(args.output, fmt)
+    batches = iter_batches(iter_image_paths(args.inputs), args.batch_size, completed)
+    in_flight = deque()
+    classified = 0
+    errors = 0
+    inference_seconds = 0.0
+    started = time.perf_counter()
+    last_report = started
+
+    try:
+        # Keep `prefetch` batches decoding while the model works on the current one
+        for paths in batches:
+            in_flight.append(pool.submit(decode_batch, paths))
+            if len(in_flight) < args.prefetch:
+                continue
+            classified, errors, inference_seconds = _drain_one(
+                in_flight.popleft(), backend, writer, classified, errors, inference_seconds
+            )
+            if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                _report_progress(classified, errors, last_report - started)
+
+        while in_flight:
+            classified, errors, inference_seconds = _drain_one(
+                in_flight.popleft(), backend, writer, classified, errors, inference_seconds
+            )
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume")
+        for future in in_flight:
+            future.cancel()
+    finally:
+        writer.close()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "classified": classified,
+        "errors": errors,
+        "skipped": len(completed),
+        "elapsed_seconds": round(elapsed, 2),
+        "images_per_second": round((classified + errors) / elapsed, 2) if elapsed else 0.0,
+        "inference_seconds": round(inference_seconds, 2),
+    }
+
+def _drain_one(future, backend, writer, classified, errors, inference_seconds):
+    """Classify one decoded batch and append its results"""
+    batch, decoded, decode_errors = future.result()
+
+    predictions = []
+    if batch is not None:
+        started = time.perf_counter()
+        predictions = predict_herbs(backend, batch)
+        inference_seconds += time.perf_counter() - started
+
+    for path, (prediction, confidence) in zip(decoded, predictions):
+        writer.write({"path": path, "prediction": prediction, "confidence": round(confidence, 2)})
+        classified += 1
+    for path, error in decode_errors.items():
+        writer.write({"path": path, "error": error})
+        errors += 1
+
+    writer.flush()
+    return classified, errors, inference_seconds
+
+def _report_progress(classified, errors, elapsed):
+    rate = (classified + errors) / elapsed if elapsed else 0.0
+    print(f"{classified} classified, {errors} errors, {rate:.1f} images/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a directory of herb photos in bulk")
+    parser.add_argument("inputs", nargs="+", help="Directories, image files, or text files listing image paths")
+    parser.add_argument("--output", required=True, help="Results file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per forward pass")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="Decoder processes")
+    parser.add_argument("--prefetch", type=int, default=4, help="Batches decoded ahead of the model")
+    parser.add_argument("--engine", default=Config.INFERENCE_ENGINE, help="Inference engine (auto, keras, onnx, tflite)")
+    parser.add_argument("--model", help="Model file (default: the configured model for the engine)")
+    parser.add_argument("--restart", action="store_true", help="Discard an existing output file instead of resuming")
+    args = parser.parse_args()
+
+    args.batch_size = max(1, args.batch_size)
+    args.prefetch = max(1, args.prefetch)
+
+    for source in args.inputs:
+        if not os.path.exists(source):
+            print(f"Input not found: {source}")
+            sys.exit(1)
+
+    summary = classify(args)
+    print("\n=== Bulk classification ===")
+    print(f"Classified {summary['classified']} images ({summary['errors']} errors, "
+          f"{summary['skipped']} already done) in {summary['elapsed_seconds']} s")
+    print(f"Throughput: {summary['images_per_second']} images/s "
+          f"(model busy for {summary['inference_seconds']} s)")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
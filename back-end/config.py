@@ -1,27 +1,117 @@
 import os
-import tensorflow as tf
+
+# Configuration profile: 'development' (debug + reloader) or 'production'
+PROFILE = os.environ.get('AYURVIGNANA_PROFILE', 'development').lower()
+PROFILE_DEFAULTS = {
+    'development': {'DEBUG': 'true', 'USE_RELOADER': 'true'},
+    'production': {'DEBUG': 'false', 'USE_RELOADER': 'false'},
+}
+
+def env_flag(name):
+    """Read a boolean setting from the environment, falling back to the profile default"""
+    default = PROFILE_DEFAULTS.get(PROFILE, PROFILE_DEFAULTS['development']).get(name, 'false')
+    return os.environ.get(name, default).lower() == 'true'
 
 class Config:
-    # Suppress TensorFlow warnings
-    os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # 0=all, 1=info, 2=warning, 3=error
-    tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+    # Suppress TensorFlow warnings (TensorFlow itself is imported lazily when a model is loaded)
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')  # 0=all, 1=info, 2=warning, 3=error
     
     # Flask Configuration
     SECRET_KEY = os.environ.get('SECRET_KEY', 'ayurvignana-secret-key')
-    DEBUG = True
+    PROFILE = PROFILE
+    DEBUG = env_flag('DEBUG')
+    USE_RELOADER = env_flag('USE_RELOADER')
+    HOST = os.environ.get('HOST', '0.0.0.0')
+    PORT = int(os.environ.get('PORT', 5000))
+    
+    # Production server (serve.py): pre-forked workers, each loading the model after the fork
+    WORKERS = int(os.environ.get('WORKERS', os.cpu_count() or 1))
+    # Load the model in the parent before forking (not fork-safe with TensorFlow or ONNX Runtime)
+    PRELOAD_MODEL = env_flag('PRELOAD_MODEL')
+    # Per-worker inference threads (0 = library default); size so WORKERS * INTRA_OP_THREADS ~ cores
+    INTRA_OP_THREADS = int(os.environ.get('INTRA_OP_THREADS', 0))
+    INTER_OP_THREADS = int(os.environ.get('INTER_OP_THREADS', 0))
     
     # MongoDB Configuration
-    MONGO_URI = "mongodb://localhost:27017"
-    MONGO_DB_NAME = "ayurvignana"
+    MONGO_URI = os.environ.get('MONGO_URI', "mongodb://localhost:27017")
+    MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', "ayurvignana")
+    MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 3000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 3000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 10000))
+    MONGO_READ_PREFERENCE = os.environ.get('MONGO_READ_PREFERENCE', 'primary')
+    MONGO_RECONNECT_INTERVAL = float(os.environ.get('MONGO_RECONNECT_INTERVAL', 10))  # seconds
+    HERB_CATALOG_TTL = float(os.environ.get('HERB_CATALOG_TTL', 300))  # seconds
+    SYMPTOM_MATCHER_TTL = float(os.environ.get('SYMPTOM_MATCHER_TTL', 300))  # seconds
+    RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', 2048))  # cached /api/recommend queries (0 disables)
+    RECOMMENDATION_CACHE_TTL = float(os.environ.get('RECOMMENDATION_CACHE_TTL', 3600))  # seconds
+    MIGRATE_ON_STARTUP = os.environ.get('MIGRATE_ON_STARTUP', 'true').lower() == 'true'  # Apply index migrations and check query plans
     
     # Upload Configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+    SAVE_UPLOADS = os.environ.get('SAVE_UPLOADS', 'true').lower() == 'true'  # Keep originals on disk (written in the background)
+    UPLOAD_WRITER_THREADS = int(os.environ.get('UPLOAD_WRITER_THREADS', 2))
+    UPLOAD_WRITE_QUEUE = int(os.environ.get('UPLOAD_WRITE_QUEUE', 64))  # pending writes before callers write inline
+    UPLOAD_WRITE_TIMEOUT = float(os.environ.get('UPLOAD_WRITE_TIMEOUT', 10))  # seconds; the URL is omitted past this
+    # Retention policy for stored uploads (0 disables a limit)
+    UPLOAD_RETENTION_DAYS = float(os.environ.get('UPLOAD_RETENTION_DAYS', 0))
+    UPLOAD_MAX_TOTAL_MB = float(os.environ.get('UPLOAD_MAX_TOTAL_MB', 0))
+    UPLOAD_GC_INTERVAL = float(os.environ.get('UPLOAD_GC_INTERVAL', 3600))  # seconds between retention sweeps
+    UPLOAD_CACHE_MAX_AGE = int(os.environ.get('UPLOAD_CACHE_MAX_AGE', 365 * 24 * 3600))  # uploads are immutable
     
     # Update Model Configuration
-    MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AyurVignana_prediction_cnn_.h5')
+    MODEL_PATH = os.environ.get('MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AyurVignana_prediction_cnn_.h5'))
     IMG_SIZE = (150, 150)  # Updated to match model's expected input size
+    # Decode large JPEGs at 1/2, 1/4 or 1/8 scale. Opt-in: this changes the model's input pixels,
+    # so check top-1 agreement with `benchmark_preprocessing.py --model ... --images ...` first
+    REDUCED_DECODE = os.environ.get('REDUCED_DECODE', 'false').lower() == 'true'
+    
+    # Inference engine: 'auto' (chosen from the MODEL_PATH extension), 'keras', 'onnx' or 'tflite'
+    # (ONNX/TFLite files are exported with convert_model.py or quantize_model.py)
+    INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'auto')
+    ONNX_MODEL_PATH = os.environ.get('ONNX_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AyurVignana_prediction_cnn_.onnx'))
+    TFLITE_MODEL_PATH = os.environ.get('TFLITE_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'AyurVignana_prediction_cnn_.tflite'))
+    XLA_COMPILE = os.environ.get('XLA_COMPILE', 'false').lower() == 'true'  # jit_compile the Keras serving function
+    
+    # Micro-batching Configuration (concurrent predictions share one forward pass)
+    BATCH_MAX_SIZE = int(os.environ.get('BATCH_MAX_SIZE', 16))
+    BATCH_MAX_WAIT_MS = float(os.environ.get('BATCH_MAX_WAIT_MS', 5))
+    PREDICT_TIMEOUT = float(os.environ.get('PREDICT_TIMEOUT', 30))  # seconds
+    PREDICT_TOP_K_MAX = int(os.environ.get('PREDICT_TOP_K_MAX', 10))  # largest top_k a client may request
+    # Batch sizes run through the model at startup before it is reported ready (those above
+    # BATCH_MAX_SIZE are skipped and BATCH_MAX_SIZE itself is always added; see serving_batch_sizes)
+    WARMUP_BATCH_SIZES = [int(size) for size in os.environ.get('WARMUP_BATCH_SIZES', '1,2,4,8,16').split(',') if size.strip()]
+    
+    # Prediction result cache (keyed by upload digest + model version)
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+    PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 24 * 3600))  # seconds
+    PREDICTION_CACHE_PATH = os.environ.get('PREDICTION_CACHE_PATH')  # SQLite file for the on-disk tier (disabled if unset)
+    
+    # Perceptual-hash index (opt-in: answers near-duplicate photos with another upload's
+    # prediction, flagged as "near_duplicate" in the response)
+    PHASH_INDEX_ENABLED = os.environ.get('PHASH_INDEX_ENABLED', 'false').lower() == 'true'
+    PHASH_INDEX_SIZE = int(os.environ.get('PHASH_INDEX_SIZE', 50000))
+    PHASH_MAX_DISTANCE = int(os.environ.get('PHASH_MAX_DISTANCE', 2))  # Hamming distance out of 64 bits
+    PHASH_INDEX_PATH = os.environ.get('PHASH_INDEX_PATH')  # JSON file the index is persisted to (disabled if unset)
+    
+    # Batch prediction endpoint
+    BATCH_PREDICT_MAX_IMAGES = int(os.environ.get('BATCH_PREDICT_MAX_IMAGES', 64))
+    DECODE_THREADS = int(os.environ.get('DECODE_THREADS', os.cpu_count() or 4))
+    
+    # Async serving (asgi_app.py): inference waits run on a bounded pool and
+    # requests beyond the concurrency limit queue on the event loop, not on threads
+    ASYNC_INFERENCE_THREADS = int(os.environ.get('ASYNC_INFERENCE_THREADS', 32))
+    ASYNC_MAX_CONCURRENT_PREDICTIONS = int(os.environ.get('ASYNC_MAX_CONCURRENT_PREDICTIONS', 256))
+    
+    # Diagnostics: admin endpoints are disabled unless ADMIN_TOKEN is set
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    PROFILER_INTERVAL_MS = float(os.environ.get('PROFILER_INTERVAL_MS', 5))
+    PROFILER_MAX_SECONDS = float(os.environ.get('PROFILER_MAX_SECONDS', 60))
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0))  # fraction of requests traced
+    TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 100))  # finished traces kept for /api/admin/traces
 
 # Classes for prediction
 CLASSES = [
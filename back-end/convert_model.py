@@ -0,0 +1,162 @@
+"""
+Export the Keras .h5 model to ONNX and/or TFLite and check the exports
+agree with the original.
+
+Exports take uint8 RGB pixels: the scaling to [0, 1] the model was
+trained with is added as a layer in front of it, so the server hands over
+resized pixels as they are and the normalization cannot drift from the
+training pipeline. --float-input exports the bare model instead.
+
+Usage:
+    python convert_model.py                      # export both formats
+    python convert_model.py --format onnx        # export ONNX only
+    python convert_model.py --images ./uploads   # verify on real images
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+from config import Config, CLASSES
+from services.prediction_service import load_inference_backend
+from utils.image_utils import pixels_to_float, preprocess_image
+
+def with_input_preprocessing(model):
+    """
+    Wrap a float-input model so it takes uint8 pixels and normalizes in-graph
+
+    Args:
+        model: Keras model trained on float32 RGB inputs in [0, 1]
+
+    Returns:
+        tf.keras.Model: Model taking (N, height, width, 3) uint8 RGB pixels
+    """
+    pixels = tf.keras.Input(shape=model.input_shape[1:], dtype=tf.uint8, name="pixels")
+    # Rescaling casts to float32 before scaling, matching pixels_to_float()
+    normalized = tf.keras.layers.Rescaling(1.0 / 255.0, name="normalize")(pixels)
+    return tf.keras.Model(pixels, model(normalized), name=f"{model.name}_pixels")
+
+def export_onnx(model, output_path, opset=13):
+    """Export a Keras model to ONNX with a dynamic batch dimension"""
+    try:
+        import tf2onnx
+    except ImportError:
+        print("tf2onnx is required for ONNX export (pip install tf2onnx)")
+        return False
+
+    input_signature = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.as_dtype(model.inputs[0].dtype), name="input"),)
+    tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=opset, output_path=output_path)
+    print(f"Exported ONNX model to {output_path}")
+    return True
+
+def export_tflite(model, output_path):
+    """Export a Keras model to a float32 TFLite flatbuffer"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"Exported TFLite model to {output_path}")
+    return True
+
+def load_samples(image_dir, count):
+    """
+    Build a verification batch from real images or synthetic inputs
+
+    Args:
+        image_dir: Directory of sample images (None for random inputs)
+        count: Number of samples
+
+    Returns:
+        numpy.ndarray: uint8 pixel batch of shape (count, height, width, 3)
+    """
+    if image_dir:
+        files = sorted(
+            os.path.join(image_dir, f) for f in os.listdir(image_dir)
+            if f.lower().endswith(tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS))
+        )[:count]
+        if files:
+            return np.concatenate([preprocess_image(f) for f in files], axis=0)
+        print(f"No images found in {image_dir}, using random inputs")
+
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (count, Config.IMG_SIZE[1], Config.IMG_SIZE[0], 3), dtype=np.uint8)
+
+def verify_backend(engine, model_path, reference, samples, tolerance):
+    """
+    Compare an exported backend with the Keras reference outputs
+
+    Args:
+        engine: 'onnx' or 'tflite'
+        model_path: Exported model file
+        reference: Keras probabilities for samples
+        samples: uint8 pixel batch (backends normalize it as their model requires)
+        tolerance: Largest absolute probability difference allowed
+
+    Returns:
+        bool: True if the backend agrees with Keras
+    """
+    backend = load_inference_backend(engine, model_path)
+    outputs = np.asarray(backend.predict(samples))
+
+    if outputs.shape != reference.shape or outputs.shape[-1] != len(CLASSES):
+        print(f"[{engine}] Output shape {outputs.shape} does not match Keras {reference.shape} / {len(CLASSES)} classes")
+        return False
+
+    max_diff = float(np.max(np.abs(outputs - reference)))
+    agree = np.argmax(outputs, axis=1) == np.argmax(reference, axis=1)
+    print(f"[{engine}] max |diff| = {max_diff:.2e}, top-1 agreement = {agree.mean() * 100:.1f}%")
+
+    for index in np.flatnonzero(~agree):
+        print(f"  sample {index}: keras={CLASSES[np.argmax(reference[index])]} "
+              f"{engine}={CLASSES[np.argmax(outputs[index])]}")
+
+    return max_diff <= tolerance and bool(agree.all())
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the AyurVignana CNN to ONNX/TFLite")
+    parser.add_argument("--model", default=Config.MODEL_PATH, help="Source .h5 model")
+    parser.add_argument("--format", choices=["onnx", "tflite", "all"], default="all")
+    parser.add_argument("--onnx-path", default=Config.ONNX_MODEL_PATH)
+    parser.add_argument("--tflite-path", default=Config.TFLITE_MODEL_PATH)
+    parser.add_argument("--images", help="Directory of sample images used for verification")
+    parser.add_argument("--samples", type=int, default=16, help="Number of verification samples")
+    parser.add_argument("--tolerance", type=float, default=1e-4, help="Max absolute probability difference")
+    parser.add_argument("--float-input", action="store_true",
+                        help="Export the bare float32 model without in-graph preprocessing")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Model file not found at: {args.model}")
+        sys.exit(1)
+
+    model = load_model(args.model)
+    print(f"Loaded {args.model} (input {model.input_shape}, output {model.output_shape})")
+
+    export_model = model if args.float_input else with_input_preprocessing(model)
+    print(f"Exporting with {tf.as_dtype(export_model.inputs[0].dtype).name} input")
+
+    exported = []
+    if args.format in ("onnx", "all") and export_onnx(export_model, args.onnx_path):
+        exported.append(("onnx", args.onnx_path))
+    if args.format in ("tflite", "all") and export_tflite(export_model, args.tflite_path):
+        exported.append(("tflite", args.tflite_path))
+
+    if not exported:
+        print("Nothing was exported.")
+        sys.exit(1)
+
+    samples = load_samples(args.images, args.samples)
+    # The reference is the original model on the normalization done outside the graph
+    reference = model.predict(pixels_to_float(samples), verbose=0)
+
+    ok = all([verify_backend(engine, path, reference, samples, args.tolerance) for engine, path in exported])
+    if ok:
+        print("\nAll exported backends agree with the Keras model.")
+    else:
+        print("\nExported backends differ from the Keras model beyond the tolerance.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Bulk ingestion of herb and recommendation catalogs into MongoDB.
+
+Streams JSONL or CSV files, validates every record against the document
+shapes in models/db_models.py and upserts them in unordered batches keyed
+on the normalized herb name (recommendations: the normalized symptom).
+Re-running with the same files writes nothing; only new or changed
+records are sent to MongoDB.
+
+CSV files need a header row. Nested fields use dotted column names
+("usage.dosage", "properties.potency"), list cells are separated with "|"
+and any cell can hold JSON (e.g. a recommendation's "herbs" array).
+
+Usage:
+    python ingest_catalog.py herbs herbs.jsonl
+    python ingest_catalog.py herbs herbs_part1.csv herbs_part2.csv --batch-size 2000
+    python ingest_catalog.py recommendations recommendations.jsonl --dry-run
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+from services.catalog_ingest import KINDS, ingest, iter_source
+from services.db_service import connect
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 5.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest herb or recommendation documents into MongoDB")
+    parser.add_argument("collection", choices=sorted(KINDS), help="Collection to ingest into")
+    parser.add_argument("sources", nargs="+", help="JSONL or CSV files")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Source format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report changes without writing")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"Source not found: {source}")
+            sys.exit(1)
+
+    db = connect()
+    if db is None:
+        print("Could not connect to MongoDB.")
+        sys.exit(1)
+
+    kind = KINDS[args.collection]
+    last_report = [time.perf_counter()]
+
+    def progress(stats):
+        if time.perf_counter() - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = time.perf_counter()
+            print(f"  {stats.read} read, {stats.inserted} new, {stats.updated} changed, "
+                  f"{stats.invalid} invalid ({stats.docs_per_second():.0f} docs/s)")
+
+    reports = {}
+    failed = False
+    for source in args.sources:
+        print(f"Ingesting {source} into '{kind.collection}'{' (dry run)' if args.dry_run else ''}")
+        stats = ingest(
+            db, kind, iter_source(source, kind, args.format),
+            batch_size=max(1, args.batch_size), dry_run=args.dry_run, progress=progress
+        )
+        reports[source] = stats.to_dict()
+        failed = failed or stats.invalid > 0 or stats.write_errors > 0
+
+        print(f"  {stats.read} records in {stats.elapsed():.2f} s ({stats.docs_per_second():.0f} docs/s)")
+        print(f"  inserted {stats.inserted}, updated {stats.updated}, unchanged {stats.unchanged}, "
+              f"invalid {stats.invalid}, duplicates {stats.duplicates}, write errors {stats.write_errors}")
+        for error in stats.errors:
+            print(f"    {error}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"collection": kind.collection, "dry_run": args.dry_run, "sources": reports}, f, indent=2)
+        print(f"Wrote {args.json}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 """
 Initialize and seed the MongoDB database with herb data
 """
-from pymongo import MongoClient
 from config import Config
+from services.db_service import connect, close
 from services.herb_service import seed_database
+from services.migrations import MigrationError, migrate_and_verify
 
 def init_database():
     """Initialize and seed the MongoDB database"""
     # Connect to MongoDB
     print(f"Connecting to MongoDB at {Config.MONGO_URI}")
-    client = MongoClient(Config.MONGO_URI)
-    db = client[Config.MONGO_DB_NAME]
+    db = connect()
+    if db is None:
+        print("Could not connect to MongoDB, aborting initialization")
+        return
+    
+    # Create and verify indexes before any data goes in
+    print("Applying database migrations")
+    try:
+        report = migrate_and_verify(db)
+        print(f"Schema at version {report['schema_version']}")
+    except MigrationError as e:
+        print(str(e))
+        close()
+        return
     
     # Seed database with initial data
     print("Seeding database with initial herb and recommendation data")
@@ -19,7 +32,7 @@ def init_database():
     print(f"Database '{Config.MONGO_DB_NAME}' initialization complete!")
     
     # Close connection
-    client.close()
+    close()
 
 if __name__ == "__main__":
     init_database()
\ No newline at end of file
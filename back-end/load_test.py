@@ -0,0 +1,506 @@
+"""
+HTTP load test for the AyurVignana API.
+
+Drives /api/predict and /api/recommend with a corpus of images and symptom
+strings and reports throughput and p50/p95/p99 latency per endpoint.
+
+Two load models are supported:
+    closed loop (default)  --concurrency clients send back to back
+    open loop  (--rate)     requests arrive as a Poisson process at the
+                            given rate; latency is measured from the
+                            scheduled arrival, so queueing is not hidden
+
+With --offline the API is started in-process against an in-memory MongoDB
+stand-in and a stub model with the real 150x150x3 -> 118-class signature,
+so the serving stack (decoding, caches, batching, routing) can be measured
+without MongoDB, TensorFlow or trained weights.
+
+Usage:
+    python load_test.py --offline --concurrency 32 --duration 30
+    python load_test.py --url http://localhost:5000 --rate 200 --images ./samples
+    python load_test.py --offline --predict-ratio 1 --fresh-images --json report.json
+"""
+import argparse
+import contextlib
+import copy
+import http.client
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from config import Config, CLASSES
+
+IMAGE_EXTENSIONS = tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS)
+DEFAULT_SYMPTOMS = [
+    "I have a headache and feel stressed",
+    "poor digestion and bloating after meals",
+    "trouble sleeping, insomnia for weeks",
+    "constant anxiety and nervousness",
+    "dry cough and sore throat",
+    "joint pain in the morning",
+    "feeling tired with low energy",
+    "skin rash and itching",
+]
+
+class InMemoryCollection:
+    """Just enough of a PyMongo collection for the API's queries"""
+
+    def __init__(self, name):
+        self.name = name
+        self._documents = []
+        self._lock = threading.Lock()
+
+    def _matches(self, document, query):
+        return all(document.get(key) == value for key, value in (query or {}).items())
+
+    def _project(self, document, projection):
+        if not projection:
+            return copy.deepcopy(document)
+        included = [key for key, value in projection.items() if value and key != "_id"]
+        if included:
+            result = {key: copy.deepcopy(document[key]) for key in included if key in document}
+        else:
+            result = copy.deepcopy(document)
+            for key, value in projection.items():
+                if not value:
+                    result.pop(key, None)
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        else:
+            result.pop("_id", None)
+        return result
+
+    def find(self, query=None, projection=None):
+        with self._lock:
+            documents = [doc for doc in self._documents if self._matches(doc, query)]
+        return iter([self._project(doc, projection) for doc in documents])
+
+    def find_one(self, query=None, projection=None):
+        return next(self.find(query, projection), None)
+
+    def count_documents(self, query):
+        with self._lock:
+            return sum(1 for doc in self._documents if self._matches(doc, query))
+
+    def insert_many(self, documents):
+        with self._lock:
+            for document in documents:
+                document.setdefault("_id", uuid.uuid4().hex)
+                self._documents.append(copy.deepcopy(document))
+
+    def watch(self):
+        from pymongo.errors import OperationFailure
+        raise OperationFailure("The in-memory stand-in does not support change streams")
+
+class InMemoryDatabase:
+    """Database whose collections are created on first access"""
+
+    def __init__(self):
+        self._collections = {}
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = InMemoryCollection(name)
+        return self._collections[name]
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+class InMemoryClient:
+    """Stand-in for MongoClient used by services.db_service in offline mode"""
+
+    def __init__(self):
+        self._databases = {}
+        self.admin = self
+
+    def command(self, name):
+        return {"ok": 1.0}
+
+    def __getitem__(self, name):
+        return self._databases.setdefault(name, InMemoryDatabase())
+
+    def close(self):
+        pass
+
+class StubModel:
+    """
+    Tiny stand-in for the CNN with the same input and output signature
+
+    Maps (N, 150, 150, 3) images in [0, 1] to (N, 118) softmax probabilities
+    (not being an inference backend, it is given normalized floats)
+    with a fixed random projection of per-channel block means, so
+    predictions depend on the image and cost a few microseconds.
+    """
+
+    def __init__(self, seed=0):
+        import numpy as np
+        self._np = np
+        rng = np.random.default_rng(seed)
+        self._weights = rng.standard_normal((5 * 5 * 3, len(CLASSES))).astype(np.float32) * 4.0
+
+    def predict(self, batch):
+        np = self._np
+        batch = np.asarray(batch, dtype=np.float32)
+        if batch.ndim != 4 or batch.shape[1:] != (Config.IMG_SIZE[1], Config.IMG_SIZE[0], 3):
+            raise ValueError(f"Expected input of shape (N, 150, 150, 3), got {batch.shape}")
+        features = batch.reshape(len(batch), 5, 30, 5, 30, 3).mean(axis=(2, 4)).reshape(len(batch), -1)
+        logits = features @ self._weights
+        logits -= logits.max(axis=1, keepdims=True)
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+def start_offline_server():
+    """
+    Start the Flask API in-process with the in-memory database and stub model
+
+    Returns:
+        tuple: (base URL, server) - call server.shutdown() when done
+    """
+    import logging
+    from werkzeug.serving import make_server
+
+    import app as api
+    from services import db_service
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    # Benchmark uploads are not worth keeping on disk
+    api.app.config['SAVE_UPLOADS'] = False
+    # The in-memory stand-in has no indexes or query planner to migrate
+    api.app.config['MIGRATE_ON_STARTUP'] = False
+
+    # db_service reuses a client created in this process, so connect() picks up the stand-in
+    db_service._client = InMemoryClient()
+    db_service._client_pid = os.getpid()
+
+    # Caches are keyed by the model file, so the stub gets a file of its own
+    stub_path = os.path.join(tempfile.gettempdir(), f"ayurvignana_stub_model_{os.getpid()}.bin")
+    with open(stub_path, "wb") as f:
+        f.write(b"ayurvignana stub model")
+
+    api.prepare_database()
+    api.prepare_model(preloaded=(StubModel(), stub_path))
+    if api.model_state != "ready":
+        raise RuntimeError(f"Stub model failed to start ({api.model_state})")
+
+    server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="offline-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def load_images(directory, count):
+    """
+    Load sample images as (filename, bytes), or generate random ones
+
+    Args:
+        directory: Directory of sample images (None to generate)
+        count: Number of images to generate when no directory is given
+
+    Returns:
+        list: (filename, image bytes) tuples
+    """
+    if directory:
+        images = []
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    with open(os.path.join(root, name), "rb") as f:
+                        images.append((name, f.read()))
+        if images:
+            return images
+        print(f"No images found in {directory}, generating random ones")
+
+    return [(f"generated_{index}.jpg", generate_image(random.Random(index))) for index in range(count)]
+
+def generate_image(rng, size=(300, 300)):
+    """Encode a random blocky JPEG (distinct hashes, realistic decode cost)"""
+    import cv2
+    import numpy as np
+
+    blocks = np.frombuffer(rng.randbytes(12 * 12 * 3), dtype=np.uint8).reshape(12, 12, 3)
+    image = cv2.resize(blocks, size, interpolation=cv2.INTER_LINEAR)
+    ok, encoded = cv2.imencode(".jpg", image)
+    return encoded.tobytes()
+
+def load_symptoms(path):
+    """Read one symptom string per line, or use the built-in corpus"""
+    if not path:
+        return DEFAULT_SYMPTOMS
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def encode_multipart(field, filename, content):
+    """Build a multipart/form-data body with a single file field"""
+    boundary = uuid.uuid4().hex
+    body = b"".join([
+        f"--{boundary}\r\n".encode(),
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'.encode(),
+        b"Content-Type: application/octet-stream\r\n\r\n",
+        content,
+        f"\r\n--{boundary}--\r\n".encode(),
+    ])
+    return body, f"multipart/form-data; boundary={boundary}"
+
+class Client:
+    """One keep-alive HTTP connection to the API"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self._host = parts.hostname
+        self._port = parts.port or 80
+        self._prefix = parts.path.rstrip("/")
+        self._timeout = timeout
+        self._connection = None
+
+    def request(self, method, path, body, content_type):
+        if self._connection is None:
+            self._connection = http.client.HTTPConnection(self._host, self._port, timeout=self._timeout)
+        try:
+            self._connection.request(method, self._prefix + path, body=body, headers={"Content-Type": content_type})
+            response = self._connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self._connection.close()
+            self._connection = None
+            raise
+
+class LoadTest:
+    """
+    Generates load against the API and records per-endpoint latencies
+
+    Args:
+        base_url: API root, e.g. http://localhost:5000
+        images: (filename, bytes) corpus for /api/predict
+        symptoms: Symptom strings for /api/recommend
+        predict_ratio: Fraction of requests sent to /api/predict
+        fresh_images: Send a newly generated image with every predict request
+            (defeats the result caches)
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(self, base_url, images, symptoms, predict_ratio=0.5, fresh_images=False, timeout=30.0):
+        self.base_url = base_url
+        self.images = images
+        self.symptoms = symptoms
+        self.predict_ratio = predict_ratio
+        self.fresh_images = fresh_images
+        self.timeout = timeout
+        self._results = {"predict": [], "recommend": []}
+        self._errors = {"predict": 0, "recommend": 0}
+        self._lock = threading.Lock()
+        self._recording = False
+        self._sequence = itertools.count()
+
+    def _build_request(self, rng):
+        if rng.random() < self.predict_ratio:
+            if self.fresh_images:
+                filename, content = f"fresh_{next(self._sequence)}.jpg", generate_image(rng)
+            else:
+                filename, content = self.images[next(self._sequence) % len(self.images)]
+            body, content_type = encode_multipart("image", filename, content)
+            return "predict", "/api/predict", body, content_type
+        body = json.dumps({"symptoms": rng.choice(self.symptoms)}).encode()
+        return "recommend", "/api/recommend", body, "application/json"
+
+    def _send(self, client, rng, started=None):
+        endpoint, path, body, content_type = self._build_request(rng)
+        if started is None:
+            started = time.perf_counter()
+        try:
+            ok = 200 <= client.request("POST", path, body, content_type) < 300
+        except Exception:
+            ok = False
+        latency = time.perf_counter() - started
+
+        if self._recording:
+            with self._lock:
+                if ok:
+                    self._results[endpoint].append(latency)
+                else:
+                    self._errors[endpoint] += 1
+
+    def run_closed(self, concurrency, duration, warmup):
+        """Each of `concurrency` clients sends its next request as soon as the last returns"""
+        deadline = time.perf_counter() + warmup + duration
+
+        def worker(seed):
+            client = Client(self.base_url, self.timeout)
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                self._send(client, rng)
+
+        return self._run(warmup, duration, [threading.Thread(target=worker, args=(seed,), daemon=True)
+                                             for seed in range(concurrency)])
+
+    def run_open(self, rate, concurrency, duration, warmup):
+        """Requests arrive at `rate` per second (Poisson), served by up to `concurrency` clients"""
+        arrivals = queue.Queue()
+        deadline = time.perf_counter() + warmup + duration
+
+        def schedule():
+            rng = random.Random(-1)
+            next_arrival = time.perf_counter()
+            while next_arrival < deadline:
+                delay = next_arrival - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                arrivals.put(next_arrival)
+                next_arrival += rng.expovariate(rate)
+            for _ in range(concurrency):
+                arrivals.put(None)
+
+        def worker(seed):
+            client = Client(self.base_url, self.timeout)
+            rng = random.Random(seed)
+            while True:
+                scheduled = arrivals.get()
+                if scheduled is None:
+                    return
+                # Latency counts from the scheduled arrival, including time spent queued here
+                self._send(client, rng, started=scheduled)
+
+        threads = [threading.Thread(target=schedule, daemon=True)]
+        threads += [threading.Thread(target=worker, args=(seed,), daemon=True) for seed in range(concurrency)]
+        return self._run(warmup, duration, threads)
+
+    def _run(self, warmup, duration, threads):
+        for thread in threads:
+            thread.start()
+        time.sleep(warmup)
+        self._recording = True
+        started = time.perf_counter()
+        time.sleep(duration)
+        self._recording = False
+        elapsed = time.perf_counter() - started
+        for thread in threads:
+            thread.join(self.timeout)
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        """
+        Summarize the recorded window
+
+        Args:
+            elapsed: Length of the measurement window in seconds
+
+        Returns:
+            dict: Per-endpoint request counts, throughput and latency percentiles
+        """
+        report = {"duration_seconds": round(elapsed, 2), "endpoints": {}}
+        with self._lock:
+            for endpoint, latencies in self._results.items():
+                if not latencies and not self._errors[endpoint]:
+                    continue
+                latencies = sorted(latencies)
+                report["endpoints"][endpoint] = {
+                    "requests": len(latencies),
+                    "errors": self._errors[endpoint],
+                    "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                    "p50_ms": percentile(latencies, 50),
+                    "p95_ms": percentile(latencies, 95),
+                    "p99_ms": percentile(latencies, 99),
+                    "max_ms": round(latencies[-1] * 1000.0, 2) if latencies else None,
+                }
+        return report
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of sorted seconds, in milliseconds"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return round(sorted_values[rank] * 1000.0, 2)
+
+def print_report(report):
+    print(f"\n=== Load test ({report['duration_seconds']} s measured) ===")
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, stats in report["endpoints"].items():
+        values = [stats[key] if stats[key] is not None else float("nan") for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+        print(f"{endpoint:<10} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>9.1f} "
+              + " ".join(f"{value:>9.2f}" for value in values))
+
+def fetch_health(base_url):
+    """Fetch /api/health (for cache and batching statistics after the run)"""
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=10)
+    try:
+        connection.request("GET", parts.path.rstrip("/") + "/api/health")
+        return json.loads(connection.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the AyurVignana predict and recommend endpoints")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running API, e.g. http://localhost:5000")
+    target.add_argument("--offline", action="store_true", help="Start the API in-process with a stub model and in-memory DB")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--rate", type=float, help="Open-loop arrival rate in requests/s (default: closed loop)")
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--predict-ratio", type=float, default=0.5, help="Fraction of requests sent to /api/predict")
+    parser.add_argument("--images", help="Directory of sample images (default: generated)")
+    parser.add_argument("--generated-images", type=int, default=64, help="Number of images to generate without --images")
+    parser.add_argument("--fresh-images", action="store_true", help="New image per request, bypassing the result caches")
+    parser.add_argument("--symptoms", help="Text file with one symptom string per line")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--json", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.generated_images) if args.predict_ratio > 0 else []
+    symptoms = load_symptoms(args.symptoms)
+
+    server = None
+    base_url = args.url
+    if args.offline:
+        print("Starting the API in-process (stub model, in-memory database)...")
+        # The API logs every request; keep the console for the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            base_url, server = start_offline_server()
+
+    mode = f"open loop at {args.rate} req/s" if args.rate else "closed loop"
+    print(f"Load testing {base_url} ({mode}, {args.concurrency} clients, "
+          f"{args.predict_ratio * 100:.0f}% predict) for {args.warmup} + {args.duration} s")
+
+    test = LoadTest(base_url, images, symptoms, args.predict_ratio, args.fresh_images, args.timeout)
+    quiet = open(os.devnull, "w") if args.offline else None
+    try:
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            if args.rate:
+                report = test.run_open(args.rate, args.concurrency, args.duration, args.warmup)
+            else:
+                report = test.run_closed(args.concurrency, args.duration, args.warmup)
+    finally:
+        if quiet:
+            quiet.close()
+
+    health = fetch_health(base_url)
+    if health:
+        report["server"] = {key: health.get(key) for key in ("batching", "prediction_cache", "phash_index")}
+    if server is not None:
+        server.shutdown()
+
+    print_report(report)
+    if health and health.get("prediction_cache"):
+        print(f"Server result cache hit ratio: {health['prediction_cache'].get('hit_ratio', 0.0) * 100:.1f}%")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+
+    if not report["endpoints"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Apply and verify the database index migrations.
+
+Runs the pending migrations from services/migrations.py, checks that every
+expected index exists with the right definition, and explains the hot
+herb and recommendation queries to make sure none falls back to a
+collection scan. Exits non-zero if anything is wrong.
+
+The server runs the same migrations at startup (MIGRATE_ON_STARTUP).
+
+Usage:
+    python migrate.py                 # apply pending migrations and verify
+    python migrate.py --status        # show applied and pending migrations
+    python migrate.py --repair        # re-run every migration (e.g. after a drop)
+    python migrate.py --json report.json
+"""
+import argparse
+import json
+import sys
+
+from pymongo.errors import OperationFailure
+
+from services.db_service import close, connect
+from services.migrations import MIGRATIONS, MigrationError, applied_versions, migrate_and_verify
+
+def print_status(db):
+    applied = applied_versions(db)
+    for version, description, _ in MIGRATIONS:
+        print(f"  [{'x' if version in applied else ' '}] {version}: {description}")
+    pending = [version for version, _, _ in MIGRATIONS if version not in applied]
+    print(f"{len(applied)} applied, {len(pending)} pending")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply and verify AyurVignana database migrations")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    parser.add_argument("--repair", action="store_true", help="Re-run every migration")
+    parser.add_argument("--skip-explain", action="store_true", help="Do not check the hot query plans")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    db = connect()
+    if db is None:
+        print("Could not connect to MongoDB.")
+        sys.exit(1)
+
+    try:
+        if args.status:
+            print_status(db)
+            return
+
+        try:
+            report = migrate_and_verify(db, repair=args.repair, explain=not args.skip_explain)
+        except (MigrationError, OperationFailure) as e:
+            print(f"\n{str(e)}")
+            sys.exit(1)
+
+        print(f"\nSchema at version {report['schema_version']} "
+              f"({len(report['applied'])} migrations applied in this run)")
+        for plan in report["query_plans"]:
+            print(f"  {plan['query']}: {' > '.join(plan['stages'])}")
+        print("All indexes and query plans verified.")
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"Wrote {args.json}")
+    finally:
+        close()
+
+if __name__ == "__main__":
+    main()
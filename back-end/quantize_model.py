@@ -0,0 +1,238 @@
+"""
+Int8 post-training quantization of the AyurVignana CNN.
+
+Calibrates on a directory of representative images (run through the same
+preprocess_image steps as the server), writes an int8 TFLite model and a
+report comparing it with the float model: top-1 agreement, per-class
+accuracy drift, p50/p99 latency and model size.
+
+The quantized model is served by pointing MODEL_PATH at the .tflite file.
+
+Usage:
+    python quantize_model.py --calibration ./calibration_images
+    python quantize_model.py --calibration ./calib --eval ./labelled_eval
+
+An evaluation directory with one sub-directory per class name (as listed
+in config.CLASSES) enables per-class accuracy; a flat directory reports
+agreement only.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.models import load_model
+
+from config import Config, CLASSES
+from services.prediction_service import load_inference_backend
+from utils.image_utils import pixels_to_float, preprocess_image
+
+IMAGE_EXTENSIONS = tuple(f".{ext}" for ext in Config.ALLOWED_EXTENSIONS)
+
+def list_images(directory):
+    """
+    Find images in a directory tree, labelled by their class sub-directory
+
+    Args:
+        directory: Root directory
+
+    Returns:
+        list: (image_path, class_index or None) tuples
+    """
+    class_index = {name: index for index, name in enumerate(CLASSES)}
+    images = []
+    for root, _, files in os.walk(directory):
+        label = class_index.get(os.path.basename(root)) if root != directory else None
+        for f in sorted(files):
+            if f.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((os.path.join(root, f), label))
+    return images
+
+def quantize(model, calibration_images, output_path, int8_io=False):
+    """
+    Convert a Keras model to a fully int8 TFLite model
+
+    Args:
+        model: Float Keras model
+        calibration_images: Image paths used to calibrate activation ranges
+        output_path: Where to write the .tflite file
+        int8_io: Also quantize the input/output tensors (the server
+            quantizes its inputs itself, so this is optional)
+    """
+    def representative_dataset():
+        for path in calibration_images:
+            # The float model is calibrated on the normalized inputs it was trained on
+            yield [pixels_to_float(preprocess_image(path))]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    if int8_io:
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+    print(f"Wrote int8 model to {output_path}")
+
+def measure_latency(backend, sample, runs):
+    """
+    Single-image latency of a backend
+
+    Args:
+        backend: Inference backend
+        sample: One preprocessed image of shape (1, height, width, 3)
+        runs: Number of timed runs (after a short warmup)
+
+    Returns:
+        dict: p50 and p99 latency in milliseconds
+    """
+    for _ in range(min(5, runs)):
+        backend.predict(sample)
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        backend.predict(sample)
+        timings.append((time.perf_counter() - started) * 1000.0)
+
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p99_ms": float(np.percentile(timings, 99)),
+    }
+
+def build_report(float_backend, int8_backend, eval_images, float_path, int8_path, latency_runs):
+    """
+    Compare the quantized model with the float model
+
+    Args:
+        float_backend: Backend serving the float model
+        int8_backend: Backend serving the quantized model
+        eval_images: (path, class_index or None) tuples
+        float_path: Float model file
+        int8_path: Quantized model file
+        latency_runs: Number of timed single-image runs per model
+
+    Returns:
+        dict: Report
+    """
+    float_top1 = []
+    int8_top1 = []
+    labels = []
+    for path, label in eval_images:
+        image = preprocess_image(path)
+        float_top1.append(int(np.argmax(float_backend.predict(image)[0])))
+        int8_top1.append(int(np.argmax(int8_backend.predict(image)[0])))
+        labels.append(label)
+
+    float_top1 = np.array(float_top1)
+    int8_top1 = np.array(int8_top1)
+    agreement = float(np.mean(float_top1 == int8_top1)) if len(eval_images) else None
+
+    per_class = {}
+    for index, name in enumerate(CLASSES):
+        rows = [i for i, label in enumerate(labels) if label == index]
+        if rows:
+            float_acc = float(np.mean(float_top1[rows] == index))
+            int8_acc = float(np.mean(int8_top1[rows] == index))
+            per_class[name] = {
+                "samples": len(rows),
+                "float_accuracy": float_acc,
+                "int8_accuracy": int8_acc,
+                "drift": int8_acc - float_acc,
+            }
+        else:
+            # Without labels, compare how often images the float model assigns to this class keep their label
+            rows = np.flatnonzero(float_top1 == index)
+            if len(rows):
+                per_class[name] = {
+                    "samples": int(len(rows)),
+                    "agreement": float(np.mean(int8_top1[rows] == index)),
+                }
+
+    sample = preprocess_image(eval_images[0][0]) if eval_images else np.random.default_rng(0).integers(
+        0, 256, (1, Config.IMG_SIZE[1], Config.IMG_SIZE[0], 3), dtype=np.uint8)
+
+    return {
+        "eval_images": len(eval_images),
+        "top1_agreement": agreement,
+        "per_class": per_class,
+        "latency": {
+            "float": measure_latency(float_backend, sample, latency_runs),
+            "int8": measure_latency(int8_backend, sample, latency_runs),
+        },
+        "model_size_bytes": {
+            "float": os.path.getsize(float_path),
+            "int8": os.path.getsize(int8_path),
+        },
+    }
+
+def print_report(report):
+    print("\n=== Quantization report ===")
+    if report["top1_agreement"] is not None:
+        print(f"Top-1 agreement: {report['top1_agreement'] * 100:.2f}% over {report['eval_images']} images")
+    for engine in ("float", "int8"):
+        latency = report["latency"][engine]
+        size_mb = report["model_size_bytes"][engine] / (1024 * 1024)
+        print(f"{engine:>5}: p50 {latency['p50_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms, size {size_mb:.2f} MB")
+
+    drifts = sorted(
+        ((name, stats["drift"]) for name, stats in report["per_class"].items() if "drift" in stats),
+        key=lambda item: item[1]
+    )
+    if drifts:
+        print("Largest per-class accuracy drops:")
+        for name, drift in drifts[:10]:
+            print(f"  {name}: {drift * 100:+.1f} pts")
+
+def main():
+    parser = argparse.ArgumentParser(description="Int8 post-training quantization for the AyurVignana CNN")
+    parser.add_argument("--model", default=Config.MODEL_PATH, help="Float .h5 model")
+    parser.add_argument("--calibration", required=True, help="Directory of representative images")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--eval", help="Evaluation directory (defaults to the calibration directory)")
+    parser.add_argument("--output", default=os.path.splitext(Config.MODEL_PATH)[0] + "_int8.tflite")
+    parser.add_argument("--report", help="Where to write the JSON report (default: next to the output)")
+    parser.add_argument("--int8-io", action="store_true", help="Quantize input/output tensors too")
+    parser.add_argument("--latency-runs", type=int, default=200)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"Model file not found at: {args.model}")
+        sys.exit(1)
+
+    calibration = [path for path, _ in list_images(args.calibration)]
+    if not calibration:
+        print(f"No calibration images found in {args.calibration}")
+        sys.exit(1)
+    random.Random(0).shuffle(calibration)
+    calibration = calibration[:args.calibration_samples]
+    print(f"Calibrating on {len(calibration)} images")
+
+    quantize(load_model(args.model), calibration, args.output, int8_io=args.int8_io)
+
+    eval_images = list_images(args.eval or args.calibration)
+    report = build_report(
+        load_inference_backend("keras", args.model),
+        load_inference_backend("tflite", args.output),
+        eval_images,
+        args.model,
+        args.output,
+        args.latency_runs
+    )
+
+    report_path = args.report or os.path.splitext(args.output)[0] + "_report.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report)
+    print(f"\nReport written to {report_path}")
+    print(f"Serve the quantized model with MODEL_PATH={args.output}")
+
+if __name__ == "__main__":
+    main()
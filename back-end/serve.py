@@ -0,0 +1,128 @@
+"""
+Production entry point for the AyurVignana API.
+
+The parent process only binds the listening socket and pre-forks WORKERS
+processes that all accept on it. No inference runtime is imported before
+the fork: TensorFlow and ONNX Runtime start thread pools when they load a
+model, and a child forked after that can deadlock on its first inference.
+Each worker therefore imports the engine and loads the model itself, then
+starts its own threads (batch scheduler, warmup, MongoDB pool, cache
+refresh).
+
+To share the weights between workers, serve a TFLite export
+(INFERENCE_ENGINE=tflite, see convert_model.py): the interpreter maps the
+flatbuffer read-only, so all workers use the same page-cache copy.
+
+Usage:
+    AYURVIGNANA_PROFILE=production WORKERS=8 INTRA_OP_THREADS=2 python serve.py
+
+PRELOAD_MODEL=true loads the model in the parent and shares it copy-on-write
+instead. This is unsafe with the bundled engines and is only meant for
+runtimes known to survive fork() after loading.
+On platforms without fork() a single threaded server is started.
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+from werkzeug.serving import make_server
+
+import app as api
+from config import Config
+
+# Seconds to wait before replacing a worker that exited
+RESPAWN_DELAY = 1.0
+
+def configure_worker_threads():
+    """Size per-worker thread pools so workers do not oversubscribe the cores"""
+    if Config.INTRA_OP_THREADS:
+        import cv2
+        cv2.setNumThreads(Config.INTRA_OP_THREADS)
+
+def run_worker(listener, preloaded):
+    """Serve requests in a forked worker until it is told to stop"""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    configure_worker_threads()
+    api.start_background_loading(preloaded)
+
+    server = make_server(Config.HOST, Config.PORT, api.app, threaded=True, fd=listener.fileno())
+    print(f"Worker {os.getpid()} serving")
+    server.serve_forever()
+
+def spawn_worker(listener, preloaded):
+    """Fork one worker; returns its pid in the parent"""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            run_worker(listener, preloaded)
+        finally:
+            os._exit(0)
+    return pid
+
+def main():
+    print(f"Starting AyurVignana API ({Config.PROFILE} profile) with {Config.WORKERS} workers")
+
+    if not hasattr(os, "fork"):
+        print("fork() is not available on this platform, running a single threaded server")
+        api.start_background_loading()
+        api.app.run(host=Config.HOST, port=Config.PORT, debug=False, use_reloader=False, threaded=True)
+        return
+
+    preloaded = None
+    if Config.PRELOAD_MODEL:
+        print("WARNING: PRELOAD_MODEL is set; TensorFlow and ONNX Runtime are not fork-safe "
+              "once loaded and workers may hang on their first prediction")
+        started = time.perf_counter()
+        preloaded = api.load_backend()
+        print(f"Parent loaded the model in {(time.perf_counter() - started) * 1000.0:.0f} ms")
+    # Move everything allocated so far out of the GC's reach so collections
+    # in the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((Config.HOST, Config.PORT))
+    listener.listen(1024)
+    listener.set_inheritable(True)
+    print(f"Listening on http://{Config.HOST}:{Config.PORT}/api")
+
+    workers = set(spawn_worker(listener, preloaded) for _ in range(max(1, Config.WORKERS)))
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Replace workers that die until asked to stop
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"Worker {pid} exited with status {status}, restarting")
+            time.sleep(RESPAWN_DELAY)
+            workers.add(spawn_worker(listener, preloaded))
+
+    listener.close()
+    print("AyurVignana API stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Process-wide asyncio MongoDB connection pool for the ASGI server.
+
+Mirrors services.db_service with Motor, so coroutines never block the event
+loop on a database round trip. The client is bound to the event loop it was
+created on; asgi_app.py connects once per serving process at startup.
+"""
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from config import Config
+from services.db_service import READ_PREFERENCES
+
+_client = None
+_db = None
+_last_attempt = 0.0
+
+def _create_client():
+    """Create a pooled AsyncIOMotorClient from Config"""
+    return AsyncIOMotorClient(
+        Config.MONGO_URI,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        read_preference=READ_PREFERENCES.get(Config.MONGO_READ_PREFERENCE, READ_PREFERENCES["primary"]),
+    )
+
+async def connect():
+    """
+    Open (or reopen) the shared client and verify the server is reachable
+
+    Returns:
+        AsyncIOMotorDatabase: The configured database, or None if MongoDB is unreachable
+    """
+    global _client, _db, _last_attempt
+
+    _last_attempt = time.monotonic()
+    if _client is None:
+        _client = _create_client()
+
+    try:
+        await _client.admin.command('ping')
+        _db = _client[Config.MONGO_DB_NAME]
+        print("Successfully connected to MongoDB (async)")
+    except PyMongoError as e:
+        print(f"Error connecting to MongoDB: {str(e)}")
+        _db = None
+
+    return _db
+
+async def get_db():
+    """
+    Get the shared database handle
+
+    Failed connections are retried at most once every
+    MONGO_RECONNECT_INTERVAL seconds, as in services.db_service.
+
+    Returns:
+        AsyncIOMotorDatabase: The configured database, or None if MongoDB is unreachable
+    """
+    if _db is not None:
+        return _db
+
+    if time.monotonic() - _last_attempt < Config.MONGO_RECONNECT_INTERVAL:
+        return None
+
+    return await connect()
+
+def is_connected():
+    """
+    Whether the shared client is currently connected (never blocks)
+
+    Returns:
+        bool: True once a connection attempt has succeeded
+    """
+    return _db is not None
+
+def close():
+    """Close the shared client and release its pooled connections"""
+    global _client, _db
+
+    if _client is not None:
+        _client.close()
+    _client = None
+    _db = None
@@ -0,0 +1,185 @@
+"""
+Async service for herb data operations with MongoDB (Motor)
+
+Lookups are answered from the same in-memory herb catalog and symptom
+matcher as services.herb_service; only loading, refreshing and seeding talk
+to MongoDB, and they do so without blocking the event loop.
+"""
+import asyncio
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from services.async_db_service import get_db
+from services.catalog_ingest import HERB_KIND, RECOMMENDATION_KIND, keyed_document
+from services.collection_watcher import RETRY_DELAY
+from services.herb_catalog import HERB_PROJECTION, catalog
+from services.herb_resolver import resolver
+from services.recommendation_cache import lookup_recommendations
+from services.herb_service import SEED_HERBS, SEED_RECOMMENDATIONS
+from services.symptom_matcher import RECOMMENDATION_PROJECTION, matcher
+from utils.tracing import traced
+
+# Reload tasks in flight, keyed by index name, so a stale index reloads once
+_reloads = {}
+
+async def load_catalog(db):
+    """
+    Load the herb catalog from the herbs collection
+
+    Args:
+        db: Motor database connection
+
+    Returns:
+        int: Number of herbs cached
+    """
+    catalog.begin_load()
+    documents = await db.herbs.find({}, HERB_PROJECTION).to_list(length=None)
+    herbs = await asyncio.get_running_loop().run_in_executor(None, catalog.build, documents)
+    return catalog.install(herbs)
+
+async def load_matcher(db):
+    """
+    Compile the symptom matcher from the recommendations collection
+
+    Args:
+        db: Motor database connection
+
+    Returns:
+        int: Number of recommendation sets compiled
+    """
+    matcher.begin_load()
+    documents = await db.recommendations.find({}, RECOMMENDATION_PROJECTION).to_list(length=None)
+    # Compiling the automaton would stall every in-flight request if run on the loop
+    compiled = await asyncio.get_running_loop().run_in_executor(None, matcher.build, documents)
+    return matcher.install(compiled)
+
+async def watch_collection(collection, on_change):
+    """
+    Call on_change() whenever the collection is modified
+
+    Async counterpart of services.collection_watcher.watch_collection; run it
+    as a task on the serving event loop.
+
+    Args:
+        collection: Motor collection to watch
+        on_change: Callable invoked (with no arguments) after each change event
+    """
+    while True:
+        try:
+            async with collection.watch() as stream:
+                async for _ in stream:
+                    on_change()
+        except OperationFailure as e:
+            # Standalone servers do not support change streams
+            print(f"Change stream unavailable for '{collection.name}': {str(e)}")
+            return
+        except PyMongoError as e:
+            print(f"Change stream for '{collection.name}' interrupted: {str(e)}")
+            await asyncio.sleep(RETRY_DELAY)
+
+async def _reload(name, load, db):
+    try:
+        await load(db)
+    except Exception as e:
+        print(f"Error loading {name}: {str(e)}")
+
+async def _ensure_fresh(db, name, index, load):
+    """Load an index on first use and reload it in the background once stale"""
+    if not index.needs_refresh():
+        return
+    if db is None:
+        db = await get_db()
+        if db is None:
+            return
+
+    task = _reloads.get(name)
+    if task is None or task.done():
+        task = asyncio.ensure_future(_reload(name, load, db))
+        _reloads[name] = task
+
+    # Only the first load is awaited; later reloads serve the old index meanwhile
+    if not index.is_loaded():
+        await asyncio.shield(task)
+
+@traced("get_herb_by_name")
+async def get_herb_by_name(db, herb_name):
+    """
+    Get herb details by name
+
+    Args:
+        db: Motor database connection (None uses the shared pool)
+        herb_name: Name of the herb to search for
+
+    Returns:
+        dict: Herb details or None if not found
+    """
+    await _ensure_fresh(db, "herb catalog", catalog, load_catalog)
+    return catalog.lookup(herb_name)
+
+@traced("get_herb_for_class")
+async def get_herb_for_class(db, class_name):
+    """
+    Get the herb a model class resolves to
+
+    Args:
+        db: Motor database connection (None uses the shared pool)
+        class_name: Predicted class label
+
+    Returns:
+        dict: Herb details or None if the class has no catalog herb
+    """
+    await _ensure_fresh(db, "herb catalog", catalog, load_catalog)
+    return resolver.herb_for_class(class_name)
+
+@traced("get_herbs_by_names")
+async def get_herbs_by_names(db, herb_names):
+    """
+    Get herb details for several names at once
+
+    Args:
+        db: Motor database connection (None uses the shared pool)
+        herb_names: Iterable of herb names
+
+    Returns:
+        dict: Mapping of each requested name to its details (or None)
+    """
+    await _ensure_fresh(db, "herb catalog", catalog, load_catalog)
+    return {name: catalog.lookup(name) for name in herb_names}
+
+@traced("get_recommendations_by_symptoms")
+async def get_recommendations_by_symptoms(db, symptoms_text):
+    """
+    Get herb recommendations based on symptoms
+
+    Args:
+        db: Motor database connection (None uses the shared pool)
+        symptoms_text: Text containing user symptoms
+
+    Returns:
+        list: List of recommended herbs
+    """
+    await _ensure_fresh(db, "symptom matcher", matcher, load_matcher)
+    return lookup_recommendations(symptoms_text)
+
+async def seed_database(db):
+    """
+    Seed the database with initial herb and recommendation data
+
+    Args:
+        db: Motor database connection (None uses the shared pool)
+    """
+    if db is None:
+        db = await get_db()
+
+    # First check if data already exists
+    if await db.herbs.count_documents({}) > 0:
+        print("Database already seeded, skipping...")
+        return
+
+    # Insert herbs (keyed like ingested documents, so ingest_catalog.py can update them)
+    await db.herbs.insert_many([keyed_document(HERB_KIND, herb) for herb in SEED_HERBS])
+    print(f"Inserted {len(SEED_HERBS)} herbs into the database")
+
+    # Insert recommendations
+    await db.recommendations.insert_many([keyed_document(RECOMMENDATION_KIND, rec) for rec in SEED_RECOMMENDATIONS])
+    print(f"Inserted {len(SEED_RECOMMENDATIONS)} recommendation sets into the database")
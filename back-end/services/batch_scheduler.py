@@ -0,0 +1,232 @@
+"""
+Dynamic micro-batching scheduler for herb prediction.
+
+Concurrent /api/predict requests hand their preprocessed image to a single
+scheduler thread that owns the model. Requests arriving close together are
+stacked into one batch (bounded by a maximum batch size and a maximum wait
+time) and served by a single forward pass.
+"""
+import queue
+import threading
+import time
+
+import numpy as np
+
+from services.prediction_service import label_predictions, predict_probabilities, top_k_predictions
+from utils.tracing import traced
+
+class _PendingPrediction:
+    """A single caller waiting for its slice of a batched prediction"""
+
+    __slots__ = ("image", "top_k", "enqueued_at", "done", "result", "candidates", "error")
+
+    def __init__(self, image, top_k=0):
+        self.image = image
+        self.top_k = top_k
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.candidates = None
+        self.error = None
+
+class BatchScheduler:
+    """
+    Gathers single-image prediction requests into batches for the model.
+
+    Args:
+        model: Loaded Keras model (owned by the scheduler thread)
+        max_batch_size: Largest number of images per forward pass
+        max_wait_ms: How long the first request of a batch may wait for others
+    """
+
+    def __init__(self, model, max_batch_size=16, max_wait_ms=5.0):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        # Input tensor reused by every forward pass (only the scheduler thread touches it)
+        self._inputs = None
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._served = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_inference = 0.0
+        self._batch_sizes = {}
+
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    @traced("predict_herb")
+    def predict(self, preprocessed_image, timeout=None):
+        """
+        Queue one preprocessed image and wait for its prediction
+
+        Args:
+            preprocessed_image: Numpy array of shape (1, height, width, 3)
+            timeout: Seconds to wait for the result (None waits forever)
+
+        Returns:
+            tuple: (predicted_herb_name, confidence_percentage)
+        """
+        return self._wait(self._submit(preprocessed_image), timeout).result
+
+    @traced("predict_herb_top_k")
+    def predict_top_k(self, preprocessed_image, k, timeout=None):
+        """
+        Queue one preprocessed image and wait for its k most likely classes
+
+        Args:
+            preprocessed_image: Numpy array of shape (1, height, width, 3)
+            k: Number of candidates
+            timeout: Seconds to wait for the result (None waits forever)
+
+        Returns:
+            list: (class_index, class_name, confidence_percentage) tuples, best first
+        """
+        return self._wait(self._submit(preprocessed_image, top_k=max(1, int(k))), timeout).candidates
+
+    def _submit(self, preprocessed_image, top_k=0):
+        pending = _PendingPrediction(preprocessed_image, top_k)
+        self._queue.put(pending)
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._requests += 1
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+        return pending
+
+    def _wait(self, pending, timeout):
+        if not pending.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for batched prediction")
+        if pending.error is not None:
+            raise pending.error
+        return pending
+
+    @traced("predict_herbs")
+    def predict_many(self, preprocessed_batch, timeout=None):
+        """
+        Queue every image of a batch and wait for all predictions
+
+        The images join the shared queue, so they are packed into forward
+        passes of at most max_batch_size alongside concurrent requests.
+
+        Args:
+            preprocessed_batch: Numpy array of shape (N, height, width, 3)
+            timeout: Seconds to wait for the whole batch (None waits forever)
+
+        Returns:
+            list: One (predicted_herb_name, confidence_percentage) tuple per image
+        """
+        pendings = [_PendingPrediction(preprocessed_batch[i:i + 1]) for i in range(len(preprocessed_batch))]
+        for pending in pendings:
+            self._queue.put(pending)
+
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._requests += len(pendings)
+            if depth > self._max_queue_depth:
+                self._max_queue_depth = depth
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        results = []
+        for pending in pendings:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not pending.done.wait(remaining):
+                raise TimeoutError("Timed out waiting for batched prediction")
+            if pending.error is not None:
+                raise pending.error
+            results.append(pending.result)
+        return results
+
+    def stats(self):
+        """
+        Snapshot of queue depth and batch-size statistics for tuning
+
+        Returns:
+            dict: Scheduler configuration and counters
+        """
+        with self._stats_lock:
+            batches = self._batches
+            served = self._served
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": served / batches if batches else 0.0,
+                "avg_queue_wait_ms": self._total_wait * 1000.0 / served if served else 0.0,
+                "avg_inference_ms": self._total_inference * 1000.0 / batches if batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            }
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until full or the wait expires"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _stack(self, batch):
+        """Copy the batch's images into the reusable input tensor and return a view of it"""
+        sample = batch[0].image
+        shape = (self.max_batch_size,) + sample.shape[1:]
+        if self._inputs is None or self._inputs.shape != shape or self._inputs.dtype != sample.dtype:
+            self._inputs = np.empty(shape, dtype=sample.dtype)
+
+        for index, pending in enumerate(batch):
+            self._inputs[index] = pending.image[0]
+        return self._inputs[:len(batch)]
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+
+            try:
+                images = self._stack(batch)
+                probabilities = predict_probabilities(self.model, images)
+                results = label_predictions(probabilities)
+                # Candidates are only ranked when some request in the batch asked for them
+                top_k = max(pending.top_k for pending in batch)
+                candidates = top_k_predictions(probabilities, top_k) if top_k else None
+                error = None
+            except Exception as e:
+                results = None
+                candidates = None
+                error = e
+
+            finished = time.perf_counter()
+            with self._stats_lock:
+                self._batches += 1
+                self._served += len(batch)
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+                self._total_inference += finished - started
+                self._total_wait += sum(started - pending.enqueued_at for pending in batch)
+                if error is not None:
+                    self._errors += len(batch)
+
+            for index, pending in enumerate(batch):
+                if error is not None:
+                    pending.error = error
+                else:
+                    pending.result = results[index]
+                    if pending.top_k:
+                        pending.candidates = candidates[index][:pending.top_k]
+                pending.done.set()
@@ -0,0 +1,397 @@
+"""
+Bulk, idempotent ingestion of herb and recommendation documents.
+
+Records are streamed from JSONL or CSV sources, validated against the
+document shapes in models/db_models.py and written in batches of unordered
+upserts keyed on the normalized herb name (or symptom). Every stored
+document carries a hash of its content; before writing a batch, the hashes
+already in MongoDB are fetched with one query, and only new or changed
+records are sent, so re-running an ingestion of an unchanged source writes
+nothing.
+"""
+import csv
+import hashlib
+import json
+import time
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.db_models import herb_schema, recommendation_schema
+from services.herb_catalog import normalize_herb_name
+
+# Field holding the hash of a document's ingested content
+CONTENT_HASH_FIELD = "content_hash"
+
+# Allowed values of a recommended herb's "type"
+RECOMMENDATION_TYPES = {"primary", "secondary"}
+
+# Separator for list values in CSV cells (JSON arrays are accepted too)
+CSV_LIST_SEPARATOR = "|"
+
+def shape_of(sample):
+    """
+    Derive a type shape from a sample document
+
+    Args:
+        sample: Sample value (dict, list or scalar) from models/db_models.py
+
+    Returns:
+        Nested dicts/lists mirroring the sample, with types at the leaves
+    """
+    if isinstance(sample, dict):
+        return {key: shape_of(value) for key, value in sample.items()}
+    if isinstance(sample, list):
+        return [shape_of(sample[0])] if sample else [str]
+    return type(sample)
+
+class DocumentKind:
+    """
+    One ingestible collection: its shape, required fields and upsert key
+
+    Args:
+        collection: MongoDB collection name
+        shape: Type shape of a document (see shape_of)
+        required: Top-level fields every record must have
+        key_source: Field whose normalized value identifies a document
+        key_field: Stored field holding that normalized value
+    """
+
+    def __init__(self, collection, shape, required, key_source, key_field):
+        self.collection = collection
+        self.shape = shape
+        self.required = tuple(required)
+        self.key_source = key_source
+        self.key_field = key_field
+
+    def key_for(self, record):
+        return normalize_herb_name(record[self.key_source])
+
+HERB_KIND = DocumentKind(
+    "herbs",
+    shape_of(herb_schema),
+    required=("name", "scientific_name", "nature", "dosha_compatibility", "description"),
+    key_source="name",
+    key_field="name_key",
+)
+RECOMMENDATION_KIND = DocumentKind(
+    "recommendations",
+    shape_of(recommendation_schema),
+    required=("symptom", "herbs"),
+    key_source="symptom",
+    key_field="symptom_key",
+)
+
+KINDS = {kind.collection: kind for kind in (HERB_KIND, RECOMMENDATION_KIND)}
+
+def _check(value, shape, path, errors):
+    """Validate value against shape, cleaning strings; returns the cleaned value"""
+    if isinstance(shape, dict):
+        if not isinstance(value, dict):
+            errors.append(f"{path}: expected an object")
+            return value
+        cleaned = {}
+        for key, item in value.items():
+            if key not in shape:
+                errors.append(f"{path}.{key}: unknown field")
+                continue
+            if item is None or item == "":
+                continue
+            cleaned[key] = _check(item, shape[key], f"{path}.{key}", errors)
+        return cleaned
+
+    if isinstance(shape, list):
+        if not isinstance(value, list):
+            errors.append(f"{path}: expected a list")
+            return value
+        return [_check(item, shape[0], f"{path}[{index}]", errors) for index, item in enumerate(value)]
+
+    if not isinstance(value, shape):
+        errors.append(f"{path}: expected {shape.__name__}")
+        return value
+    return " ".join(value.split()) if isinstance(value, str) else value
+
+def validate(kind, record):
+    """
+    Validate and clean one record
+
+    Strings are stripped and their whitespace collapsed; empty optional
+    fields are dropped. Symptoms and related terms are lowercased, as the
+    symptom matcher expects.
+
+    Args:
+        kind: HERB_KIND or RECOMMENDATION_KIND
+        record: Parsed source record
+
+    Returns:
+        tuple: (cleaned document, list of error messages)
+    """
+    # Fields added on storage are ignored, so exported documents can be re-ingested
+    record = {key: value for key, value in record.items() if key not in ("_id", kind.key_field, CONTENT_HASH_FIELD)}
+
+    errors = []
+    document = _check(record, kind.shape, "$", errors)
+    if errors:
+        return None, errors
+
+    for field in kind.required:
+        if not document.get(field):
+            errors.append(f"$.{field}: required")
+
+    if kind is RECOMMENDATION_KIND and not errors:
+        document["symptom"] = document["symptom"].lower()
+        if "related_terms" in document:
+            document["related_terms"] = [term.lower() for term in document["related_terms"]]
+        for index, herb in enumerate(document["herbs"]):
+            if not herb.get("name"):
+                errors.append(f"$.herbs[{index}].name: required")
+            if "type" in herb and herb["type"] not in RECOMMENDATION_TYPES:
+                errors.append(f"$.herbs[{index}].type: expected one of {', '.join(sorted(RECOMMENDATION_TYPES))}")
+
+    return (None, errors) if errors else (document, [])
+
+def content_hash(document):
+    """Stable hash of a document's content (key order does not matter)"""
+    encoded = json.dumps(document, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+def keyed_document(kind, document):
+    """
+    Add the upsert key and content hash to a validated document
+
+    Args:
+        kind: HERB_KIND or RECOMMENDATION_KIND
+        document: Validated document
+
+    Returns:
+        dict: Copy of the document ready to be stored
+    """
+    stored = dict(document)
+    stored[kind.key_field] = kind.key_for(document)
+    stored[CONTENT_HASH_FIELD] = content_hash(document)
+    return stored
+
+def iter_jsonl(path):
+    """
+    Stream records from a JSON Lines file
+
+    Yields:
+        tuple: (line number, record dict or None, error message or None)
+    """
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"invalid JSON: {str(e)}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "expected a JSON object"
+                continue
+            yield line_number, record, None
+
+def _csv_value(cell, shape):
+    cell = cell.strip()
+    if not cell:
+        return None
+    if cell[0] in "[{":
+        return json.loads(cell)
+    if isinstance(shape, list):
+        return [item.strip() for item in cell.split(CSV_LIST_SEPARATOR) if item.strip()]
+    return cell
+
+def iter_csv(path, kind):
+    """
+    Stream records from a CSV file with a header row
+
+    Nested fields use dotted column names ("usage.dosage"); list cells are
+    separated with "|" or written as JSON arrays, and any cell starting with
+    "[" or "{" is parsed as JSON (e.g. a recommendation's "herbs").
+
+    Yields:
+        tuple: (line number, record dict or None, error message or None)
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            record = {}
+            try:
+                for column, cell in row.items():
+                    if column is None or cell is None:
+                        continue
+                    parts = column.strip().split(".")
+                    shape = kind.shape
+                    for part in parts:
+                        shape = shape.get(part, str) if isinstance(shape, dict) else str
+                    value = _csv_value(cell, shape)
+                    if value is None:
+                        continue
+                    target = record
+                    for part in parts[:-1]:
+                        target = target.setdefault(part, {})
+                    target[parts[-1]] = value
+            except ValueError as e:
+                yield reader.line_num, None, f"invalid JSON cell: {str(e)}"
+                continue
+            yield reader.line_num, record, None
+
+def iter_source(path, kind, fmt=None):
+    """Stream records from a JSONL or CSV file (format from the extension unless given)"""
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "jsonl")
+    if fmt == "csv":
+        return iter_csv(path, kind)
+    return iter_jsonl(path)
+
+class IngestStats:
+    """Counters for one ingestion run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.read = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.write_errors = 0
+        self.errors = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def docs_per_second(self):
+        elapsed = self.elapsed()
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        return {
+            "read": self.read,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "write_errors": self.write_errors,
+            "seconds": round(self.elapsed(), 3),
+            "docs_per_second": round(self.docs_per_second(), 1),
+        }
+
+def backfill_keys(collection, kind):
+    """
+    Add the upsert key to documents stored before keyed ingestion existed
+
+    Args:
+        collection: PyMongo collection
+        kind: HERB_KIND or RECOMMENDATION_KIND
+
+    Returns:
+        int: Number of documents updated
+    """
+    operations = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": {kind.key_field: kind.key_for(doc)}})
+        for doc in collection.find({kind.key_field: {"$exists": False}}, {kind.key_source: 1})
+        if doc.get(kind.key_source)
+    ]
+    if not operations:
+        return 0
+    return collection.bulk_write(operations, ordered=False).modified_count
+
+def write_batch(collection, kind, documents, stats, dry_run=False):
+    """
+    Upsert the new and changed documents of one batch
+
+    Args:
+        collection: PyMongo collection
+        kind: HERB_KIND or RECOMMENDATION_KIND
+        documents: {key: keyed document} for the batch
+        stats: IngestStats updated in place
+        dry_run: Count what would change without writing
+    """
+    existing = {
+        doc[kind.key_field]: doc.get(CONTENT_HASH_FIELD)
+        for doc in collection.find(
+            {kind.key_field: {"$in": list(documents)}},
+            {"_id": 0, kind.key_field: 1, CONTENT_HASH_FIELD: 1}
+        )
+    }
+
+    operations = []
+    for key, document in documents.items():
+        if key not in existing:
+            stats.inserted += 1
+        elif existing[key] == document[CONTENT_HASH_FIELD]:
+            stats.unchanged += 1
+            continue
+        else:
+            stats.updated += 1
+        # Optional fields missing from the source are removed from the stored copy
+        update = {"$set": document}
+        missing = {field: "" for field in kind.shape if field not in document}
+        if missing:
+            update["$unset"] = missing
+        operations.append(UpdateOne({kind.key_field: key}, update, upsert=True))
+
+    if not operations or dry_run:
+        return
+
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        failed = e.details.get("writeErrors", [])
+        stats.write_errors += len(failed)
+        for error in failed[:5]:
+            stats.errors.append(f"write error: {error.get('errmsg')}")
+
+def ingest(db, kind, records, batch_size=1000, dry_run=False, progress=None):
+    """
+    Validate and upsert a stream of records
+
+    Args:
+        db: MongoDB database connection
+        kind: HERB_KIND or RECOMMENDATION_KIND
+        records: Iterable of (line number, record or None, error or None)
+        batch_size: Records per bulk write
+        dry_run: Validate and diff without writing
+        progress: Optional callable(stats) invoked after every batch
+
+    Returns:
+        IngestStats: Counters for the run
+    """
+    collection = db[kind.collection]
+    stats = IngestStats()
+    if not dry_run:
+        backfilled = backfill_keys(collection, kind)
+        if backfilled:
+            print(f"Added {kind.key_field} to {backfilled} existing {kind.collection} documents")
+
+    batch = {}
+    for line_number, record, error in records:
+        stats.read += 1
+        if record is not None:
+            document, errors = validate(kind, record)
+        else:
+            document, errors = None, [error]
+        if document is None:
+            stats.invalid += 1
+            if len(stats.errors) < 20:
+                stats.errors.append(f"line {line_number}: {'; '.join(errors)}")
+            continue
+
+        stored = keyed_document(kind, document)
+        if stored[kind.key_field] in batch:
+            # The last occurrence in the source wins
+            stats.duplicates += 1
+        batch[stored[kind.key_field]] = stored
+
+        if len(batch) >= batch_size:
+            write_batch(collection, kind, batch, stats, dry_run)
+            batch = {}
+            if progress is not None:
+                progress(stats)
+
+    if batch:
+        write_batch(collection, kind, batch, stats, dry_run)
+    return stats
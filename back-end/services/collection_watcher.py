@@ -0,0 +1,44 @@
+"""
+Change notifications for read-mostly MongoDB collections.
+
+In-process caches register a callback here so they are invalidated as soon
+as a collection changes. Change streams need a replica set or sharded
+cluster; on a standalone server the watcher stops quietly and the caches
+fall back to their TTL refresh.
+"""
+import threading
+import time
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Seconds to wait before re-opening a change stream after a transient error
+RETRY_DELAY = 5.0
+
+def watch_collection(collection, on_change):
+    """
+    Call on_change() whenever the collection is modified
+
+    Args:
+        collection: PyMongo collection to watch
+        on_change: Callable invoked (with no arguments) after each change event
+
+    Returns:
+        threading.Thread: The daemon thread running the change stream
+    """
+    def run():
+        while True:
+            try:
+                with collection.watch() as stream:
+                    for _ in stream:
+                        on_change()
+            except OperationFailure as e:
+                # Standalone servers do not support change streams
+                print(f"Change stream unavailable for '{collection.name}': {str(e)}")
+                return
+            except PyMongoError as e:
+                print(f"Change stream for '{collection.name}' interrupted: {str(e)}")
+                time.sleep(RETRY_DELAY)
+
+    thread = threading.Thread(target=run, name=f"watch-{collection.name}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,107 @@
+"""
+Process-wide MongoDB connection pool.
+
+A single MongoClient is shared by every route and service in the process.
+PyMongo pools connections internally, so callers should fetch the database
+with get_db() instead of creating their own clients.
+"""
+import os
+import threading
+import time
+
+from pymongo import MongoClient, ReadPreference
+from pymongo.errors import PyMongoError
+
+from config import Config
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+_db = None
+_last_attempt = 0.0
+
+def _create_client():
+    """Create a pooled MongoClient from Config"""
+    return MongoClient(
+        Config.MONGO_URI,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        read_preference=READ_PREFERENCES.get(Config.MONGO_READ_PREFERENCE, ReadPreference.PRIMARY),
+    )
+
+def connect():
+    """
+    Open (or reopen) the shared client and verify the server is reachable
+
+    Returns:
+        Database: The configured database, or None if MongoDB is unreachable
+    """
+    global _client, _client_pid, _db, _last_attempt
+
+    with _lock:
+        _last_attempt = time.monotonic()
+
+        # MongoClient is not fork-safe, so a forked child gets its own pool
+        if _client is None or _client_pid != os.getpid():
+            _client = _create_client()
+            _client_pid = os.getpid()
+
+        try:
+            _client.admin.command('ping')
+            _db = _client[Config.MONGO_DB_NAME]
+            print("Successfully connected to MongoDB")
+        except PyMongoError as e:
+            print(f"Error connecting to MongoDB: {str(e)}")
+            _db = None
+
+        return _db
+
+def get_db():
+    """
+    Get the shared database handle
+
+    If the last connection attempt failed, a new attempt is made at most once
+    every MONGO_RECONNECT_INTERVAL seconds so requests never pay for a
+    handshake on the hot path.
+
+    Returns:
+        Database: The configured database, or None if MongoDB is unreachable
+    """
+    if _db is not None and _client_pid == os.getpid():
+        return _db
+
+    if _client_pid == os.getpid() and time.monotonic() - _last_attempt < Config.MONGO_RECONNECT_INTERVAL:
+        return None
+
+    return connect()
+
+def is_connected():
+    """
+    Whether the shared client is currently connected (never blocks)
+
+    Returns:
+        bool: True once a connection attempt has succeeded in this process
+    """
+    return _db is not None and _client_pid == os.getpid()
+
+def close():
+    """Close the shared client and release its pooled connections"""
+    global _client, _client_pid, _db
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+        _client_pid = None
+        _db = None
@@ -0,0 +1,206 @@
+"""
+Process-local cache of the herb catalog.
+
+The herbs collection is small and read-mostly, so it is loaded once into a
+dict keyed by normalized herb name. Lookups never touch MongoDB; the cache
+is refreshed in the background when its TTL expires or when a change
+notification arrives for the collection.
+"""
+import threading
+import time
+
+from config import Config
+from services.collection_watcher import watch_collection
+
+# Only the fields the API returns are kept in memory
+HERB_PROJECTION = {
+    "_id": 0,
+    "name": 1,
+    "scientific_name": 1,
+    "nature": 1,
+    "dosha_compatibility": 1,
+    "description": 1,
+}
+
+def normalize_herb_name(name):
+    """
+    Normalize a herb name for case- and spacing-insensitive lookups
+
+    Args:
+        name: Herb name as predicted or stored
+
+    Returns:
+        str: Casefolded name with collapsed whitespace
+    """
+    return " ".join(str(name).split()).casefold()
+
+class HerbCatalog:
+    """
+    In-memory herb catalog with TTL and change-stream refresh
+
+    Args:
+        ttl: Seconds before a loaded catalog is considered stale
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self.version = 0
+        self._herbs = {}
+        self._db = None
+        self._loaded_at = None
+        self._stale = False
+        self._refreshing = False
+        self._watcher = None
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """
+        Load the whole catalog from MongoDB, replacing the cached copy
+
+        Args:
+            db: MongoDB database connection
+
+        Returns:
+            int: Number of herbs cached
+        """
+        self.begin_load()
+        count = self.install(self.build(db.herbs.find({}, HERB_PROJECTION)))
+        self._db = db
+        return count
+
+    def begin_load(self):
+        """Mark the catalog fresh before fetching, so a change arriving mid-load triggers another refresh"""
+        self._stale = False
+
+    def build(self, documents):
+        """
+        Index already-fetched herb documents without touching the cached copy
+
+        The async service fetches with its own driver and runs this off the
+        event loop, then swaps the result in with install().
+
+        Args:
+            documents: Iterable of herb documents (HERB_PROJECTION fields)
+
+        Returns:
+            dict: Herbs keyed by normalized name
+        """
+        herbs = {}
+        for herb in documents:
+            herbs[normalize_herb_name(herb["name"])] = herb
+        return herbs
+
+    def install(self, herbs):
+        """
+        Replace the cached catalog with one returned by build()
+
+        Args:
+            herbs: Herbs keyed by normalized name
+
+        Returns:
+            int: Number of herbs cached
+        """
+        with self._lock:
+            self._herbs = herbs
+            self._loaded_at = time.monotonic()
+            # Lets derived tables (see services.herb_resolver) notice a reload
+            self.version += 1
+
+        print(f"Herb catalog loaded with {len(herbs)} herbs")
+        return len(herbs)
+
+    def is_loaded(self):
+        """Whether the catalog has been loaded at least once"""
+        return self._loaded_at is not None
+
+    def needs_refresh(self):
+        """Whether the catalog was never loaded, was invalidated, or is past its TTL"""
+        return self._loaded_at is None or self._stale or time.monotonic() - self._loaded_at > self.ttl
+
+    def lookup(self, herb_name):
+        """Look up a herb in the cached catalog without any refresh check"""
+        return self._herbs.get(normalize_herb_name(herb_name))
+
+    def watch(self, db):
+        """Invalidate the catalog whenever the herbs collection changes"""
+        if self._watcher is None:
+            self._watcher = watch_collection(db.herbs, self.invalidate)
+
+    def invalidate(self):
+        """Mark the catalog stale so the next lookup triggers a refresh"""
+        self._stale = True
+
+    def get(self, db, herb_name):
+        """
+        Look up a herb by name
+
+        Args:
+            db: MongoDB database connection used if a (re)load is needed
+            herb_name: Name of the herb to search for
+
+        Returns:
+            dict: Slim herb record or None if not found
+        """
+        self.ensure_fresh(db)
+        return self.lookup(herb_name)
+
+    def get_many(self, db, herb_names):
+        """
+        Look up several herbs with a single freshness check
+
+        Args:
+            db: MongoDB database connection used if a (re)load is needed
+            herb_names: Iterable of herb names
+
+        Returns:
+            dict: Mapping of each requested name to its record (or None)
+        """
+        self.ensure_fresh(db)
+        herbs = self._herbs
+        return {name: herbs.get(normalize_herb_name(name)) for name in herb_names}
+
+    def stats(self):
+        """
+        Size and age of the cached catalog
+
+        Returns:
+            dict: Catalog statistics
+        """
+        loaded_at = self._loaded_at
+        return {
+            "herbs": len(self._herbs),
+            "age_seconds": time.monotonic() - loaded_at if loaded_at is not None else None,
+            "ttl_seconds": self.ttl,
+        }
+
+    def ensure_fresh(self, db):
+        """
+        Load the catalog on first use and refresh it once stale
+
+        Args:
+            db: MongoDB database connection used if a (re)load is needed
+        """
+        if self._loaded_at is None:
+            if db is not None:
+                self.load(db)
+        elif self.needs_refresh():
+            self._refresh_in_background(db if db is not None else self._db)
+
+    def _refresh_in_background(self, db):
+        with self._lock:
+            if self._refreshing or db is None:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.load(db)
+            except Exception as e:
+                print(f"Error refreshing herb catalog: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="herb-catalog-refresh", daemon=True).start()
+
+# Shared catalog for the process
+catalog = HerbCatalog(ttl=Config.HERB_CATALOG_TTL)
@@ -0,0 +1,142 @@
+"""
+Resolution of model classes to catalog herbs.
+
+The CNN predicts labels such as "Tulsi leaf", "Neem plant" or "Bhrami leaf",
+while the catalog stores herbs as "Tulsi", "Neem" and "Brahmi". Each class
+is turned once into an ordered list of candidate names (the label itself,
+the label without its plant-part suffix, and known alternative spellings),
+and the first candidate present in the catalog becomes that class's herb.
+The resulting table is indexed by class and rebuilt only when the catalog
+is reloaded, so resolving a prediction is a list or dict lookup.
+"""
+import threading
+
+from config import CLASSES
+from services.herb_catalog import catalog, normalize_herb_name
+
+# Plant parts that CLASSES append to a herb name
+PART_SUFFIXES = ("leaf", "plant", "seed", "fruit", "flower", "root")
+
+# Normalized class names (without part suffix) -> catalog name, for spellings
+# and regional names that differ from the catalog
+HERB_ALIASES = {
+    "bhrami": "Brahmi",
+    "aloevera": "Aloe Vera",
+    "amrutaballi": "Guduchi",
+    "amruthaballi": "Guduchi",
+    "astma weed": "Asthma Weed",
+    "bringaraja": "Bhringraj",
+    "catharanthus": "Periwinkle",
+    "nithyapushpa": "Periwinkle",
+    "curry": "Curry Leaf",
+    "jeera": "Cumin",
+    "malabar nut": "Vasaka",
+    "nooni": "Noni",
+    "palak(spinach)": "Spinach",
+    "psyllium": "Isabgol",
+    "white musalli": "Safed Musli",
+    "wood sorel": "Wood Sorrel",
+}
+
+# Classes that never correspond to a herb
+UNRESOLVABLE_CLASSES = {"unknown"}
+
+def candidate_names(class_name):
+    """
+    Catalog names a class label may refer to, most specific first
+
+    Args:
+        class_name: Label from config.CLASSES
+
+    Returns:
+        list: Normalized candidate names
+    """
+    name = normalize_herb_name(class_name.replace("_", " "))
+    if name in UNRESOLVABLE_CLASSES:
+        return []
+
+    candidates = [name]
+    words = name.split()
+    while len(words) > 1 and words[-1] in PART_SUFFIXES:
+        words = words[:-1]
+        candidates.append(" ".join(words))
+
+    for candidate in list(candidates):
+        alias = HERB_ALIASES.get(candidate)
+        if alias is not None:
+            candidates.append(normalize_herb_name(alias))
+
+    # Keep the first occurrence of each candidate
+    return list(dict.fromkeys(candidates))
+
+class ClassResolver:
+    """
+    Table mapping every model class to its catalog herb record
+
+    Args:
+        classes: Class labels in model output order
+    """
+
+    def __init__(self, classes):
+        self.classes = list(classes)
+        self._candidates = [candidate_names(name) for name in self.classes]
+        self._by_index = [None] * len(self.classes)
+        self._by_class = {}
+        self._catalog_version = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        """
+        (Re)build the table from the current catalog
+
+        Returns:
+            int: Number of classes resolved to a herb
+        """
+        with self._lock:
+            version = catalog.version
+            by_index = []
+            for candidates in self._candidates:
+                herb = None
+                for candidate in candidates:
+                    herb = catalog.lookup(candidate)
+                    if herb is not None:
+                        break
+                by_index.append(herb)
+
+            self._by_index = by_index
+            self._by_class = dict(zip(self.classes, by_index))
+            self._catalog_version = version
+
+        resolved = sum(1 for herb in by_index if herb is not None)
+        print(f"Resolved {resolved} of {len(self.classes)} classes to catalog herbs")
+        return resolved
+
+    def _ensure_current(self):
+        if self._catalog_version != catalog.version:
+            self.build()
+
+    def herb_for_index(self, class_index):
+        """Catalog record for a class index, or None if the class has no herb"""
+        self._ensure_current()
+        return self._by_index[class_index]
+
+    def herb_for_class(self, class_name):
+        """Catalog record for a class label, or None if the class has no herb"""
+        self._ensure_current()
+        return self._by_class.get(class_name)
+
+    def table(self):
+        """
+        The full resolution table, for diagnostics
+
+        Returns:
+            list: {"class", "herb"} dicts in class order (herb is None if unresolved)
+        """
+        self._ensure_current()
+        return [
+            {"class": name, "herb": herb["name"] if herb else None}
+            for name, herb in zip(self.classes, self._by_index)
+        ]
+
+# Shared resolver for the process
+resolver = ClassResolver(CLASSES)
@@ -0,0 +1,220 @@
+"""
+Lightweight Prometheus metrics for the prediction pipeline.
+
+Counters and histograms are plain in-process objects guarded by a lock;
+observing a value is a bisect and two additions, so timing every stage of
+every request costs microseconds. render() produces the Prometheus text
+exposition format served on /api/metrics. Values that already live
+elsewhere (model state, cache sizes, scheduler queue depth) are collected
+at scrape time through gauge callbacks instead of being mirrored.
+
+Metrics are per process: with serve.py each worker reports its own.
+"""
+import bisect
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values))
+    return "{" + pairs + "}"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonically increasing count, optionally split by labels
+
+    Args:
+        name: Metric name
+        documentation: Help text
+        labelnames: Label names, given as keyword arguments to inc()
+    """
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class _Timer:
+    """Context manager that observes its elapsed time into a histogram"""
+
+    __slots__ = ("_histogram", "_labels", "_started")
+
+    def __init__(self, histogram, labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._started, **self._labels)
+        return False
+
+class Histogram:
+    """
+    Distribution of observed values in cumulative buckets
+
+    Args:
+        name: Metric name
+        documentation: Help text
+        labelnames: Label names, given as keyword arguments to observe()
+        buckets: Sorted upper bounds (+Inf is added automatically)
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Time a block: `with histogram.time(stage="decode"): ...`"""
+        return _Timer(self, labels)
+
+    def collect(self):
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(float(bound)),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class GaugeCallback:
+    """
+    Gauge whose samples are produced by a function at scrape time
+
+    Args:
+        name: Metric name
+        documentation: Help text
+        labelnames: Label names of the samples
+        callback: Returns an iterable of (label values tuple, value)
+    """
+
+    def __init__(self, name, documentation, labelnames, callback):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            samples = list(self.callback())
+        except Exception as e:
+            print(f"Error collecting metric {self.name}: {str(e)}")
+            samples = []
+        for key, value in samples:
+            if value is None:
+                continue
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(float(value))}")
+        return lines
+
+class Registry:
+    """Ordered collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, callback, labelnames=()):
+        """Register a GaugeCallback and return it"""
+        return self.register(GaugeCallback(name, documentation, labelnames, callback))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text (version 0.0.4)
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+# Shared registry and pipeline metrics for the process
+registry = Registry()
+
+PIPELINE_STAGE_SECONDS = registry.register(Histogram(
+    "ayurvignana_pipeline_stage_seconds",
+    "Time spent in each stage of the prediction pipeline",
+    labelnames=("endpoint", "stage")
+))
+REQUEST_SECONDS = registry.register(Histogram(
+    "ayurvignana_request_seconds",
+    "End-to-end request handling time",
+    labelnames=("endpoint", "status")
+))
+REQUESTS_TOTAL = registry.register(Counter(
+    "ayurvignana_requests_total",
+    "Requests handled, by endpoint and HTTP status",
+    labelnames=("endpoint", "status")
+))
+ERRORS_TOTAL = registry.register(Counter(
+    "ayurvignana_errors_total",
+    "Errors raised while serving, by endpoint and stage",
+    labelnames=("endpoint", "stage")
+))
+PREDICTIONS_TOTAL = registry.register(Counter(
+    "ayurvignana_predictions_total",
+    "Images classified, by where the answer came from (cache, phash or model)",
+    labelnames=("source",)
+))
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,306 @@
+"""
+Versioned index and schema migrations for the herbs and recommendations
+collections.
+
+Each migration runs once per database and is recorded in the
+schema_migrations collection. Migrations are idempotent (index builds are
+no-ops when the index already exists), so several server processes may
+run them at startup at the same time, and a database whose collections
+were dropped and re-created is repaired by running them again.
+
+After migrating, the expected indexes are verified and the query plans of
+the hot queries are checked with explain(); a plan that falls back to a
+collection scan is reported as a failure.
+"""
+import datetime
+import time
+
+from pymongo import ASCENDING
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+
+from services.catalog_ingest import HERB_KIND, RECOMMENDATION_KIND, backfill_keys
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+# Case-insensitive comparison ("tulsi" == "Tulsi"), still accent-sensitive
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+class MigrationError(Exception):
+    """A migration failed or the database does not have the expected indexes/plans"""
+
+# Every index the application relies on, by collection and index name
+INDEXES = {
+    "herbs_name_ci": {
+        "collection": "herbs",
+        "name": "name_ci_unique",
+        "keys": [("name", ASCENDING)],
+        "unique": True,
+        "collation": CASE_INSENSITIVE,
+    },
+    "herbs_name_key": {
+        "collection": "herbs",
+        "name": "name_key_unique",
+        "keys": [(HERB_KIND.key_field, ASCENDING)],
+        "unique": True,
+    },
+    "recommendations_symptom": {
+        "collection": "recommendations",
+        "name": "symptom",
+        "keys": [("symptom", ASCENDING)],
+    },
+    "recommendations_related_terms": {
+        "collection": "recommendations",
+        "name": "related_terms",
+        "keys": [("related_terms", ASCENDING)],
+    },
+    "recommendations_symptom_key": {
+        "collection": "recommendations",
+        "name": "symptom_key_unique",
+        "keys": [(RECOMMENDATION_KIND.key_field, ASCENDING)],
+        "unique": True,
+    },
+}
+
+# Hot queries and the index each must use (see check_query_plans)
+HOT_QUERIES = [
+    ("herb by name (case-insensitive)", "herbs", {"name": "Tulsi"}, CASE_INSENSITIVE),
+    ("herbs by ingestion key", "herbs", {HERB_KIND.key_field: {"$in": ["tulsi", "neem"]}}, None),
+    ("recommendation by symptom", "recommendations", {"symptom": "headache"}, None),
+    ("recommendations by related term", "recommendations", {"related_terms": "migraine"}, None),
+    ("recommendations by ingestion key", "recommendations", {RECOMMENDATION_KIND.key_field: {"$in": ["headache"]}}, None),
+]
+
+def create_index(db, index_id):
+    """
+    Build one index from INDEXES (a no-op if it already exists)
+
+    Args:
+        db: MongoDB database connection
+        index_id: Key into INDEXES
+    """
+    spec = INDEXES[index_id]
+    options = {"name": spec["name"], "unique": spec.get("unique", False)}
+    if spec.get("collation") is not None:
+        options["collation"] = spec["collation"]
+
+    try:
+        db[spec["collection"]].create_index(spec["keys"], **options)
+    except OperationFailure as e:
+        if e.code == 11000:
+            raise MigrationError(
+                f"Cannot build unique index '{spec['name']}' on {spec['collection']}: "
+                f"duplicate values exist ({e.details.get('errmsg', str(e)) if e.details else str(e)})"
+            )
+        raise
+    print(f"Index '{spec['name']}' on {spec['collection']} is in place")
+
+def _herbs_name_index(db):
+    create_index(db, "herbs_name_ci")
+
+def _recommendation_term_indexes(db):
+    create_index(db, "recommendations_symptom")
+    create_index(db, "recommendations_related_terms")
+
+def _ingestion_key_indexes(db):
+    # Documents stored before keyed ingestion would all share a missing key
+    for kind in (HERB_KIND, RECOMMENDATION_KIND):
+        backfilled = backfill_keys(db[kind.collection], kind)
+        if backfilled:
+            print(f"Added {kind.key_field} to {backfilled} {kind.collection} documents")
+    create_index(db, "herbs_name_key")
+    create_index(db, "recommendations_symptom_key")
+
+# (version, description, function(db)) in the order they are applied; never renumber
+MIGRATIONS = [
+    (1, "Unique case-insensitive index on herbs.name", _herbs_name_index),
+    (2, "Indexes on recommendations.symptom and the related_terms multikey", _recommendation_term_indexes),
+    (3, "Unique ingestion keys on herbs.name_key and recommendations.symptom_key", _ingestion_key_indexes),
+]
+
+def applied_versions(db):
+    """Versions already recorded in schema_migrations"""
+    return {doc["_id"] for doc in db[MIGRATIONS_COLLECTION].find({}, {"_id": 1})}
+
+def migrate(db, repair=False):
+    """
+    Apply pending migrations in version order
+
+    Args:
+        db: MongoDB database connection
+        repair: Re-run every migration, e.g. after collections were dropped
+
+    Returns:
+        list: Versions that were run
+    """
+    done = set() if repair else applied_versions(db)
+    ran = []
+    for version, description, apply in MIGRATIONS:
+        if version in done:
+            continue
+        print(f"Applying migration {version}: {description}")
+        started = time.perf_counter()
+        apply(db)
+        # Upserted, so processes migrating concurrently do not collide
+        db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": version},
+            {"$set": {
+                "description": description,
+                "applied_at": datetime.datetime.now(datetime.timezone.utc),
+                "duration_ms": round((time.perf_counter() - started) * 1000.0, 1),
+            }},
+            upsert=True
+        )
+        ran.append(version)
+    return ran
+
+def verify_indexes(db):
+    """
+    Check that every index in INDEXES exists with the expected definition
+
+    Args:
+        db: MongoDB database connection
+
+    Returns:
+        list: Problem descriptions (empty when all indexes are in place)
+    """
+    problems = []
+    info = {}
+    for spec in INDEXES.values():
+        collection = spec["collection"]
+        if collection not in info:
+            info[collection] = db[collection].index_information()
+        index = info[collection].get(spec["name"])
+        if index is None:
+            problems.append(f"{collection}: index '{spec['name']}' is missing")
+            continue
+        if [tuple(key) for key in index["key"]] != [tuple(key) for key in spec["keys"]]:
+            problems.append(f"{collection}: index '{spec['name']}' has keys {index['key']}")
+        if bool(index.get("unique")) != spec.get("unique", False):
+            problems.append(f"{collection}: index '{spec['name']}' unique={bool(index.get('unique'))}")
+        if spec.get("collation") is not None:
+            expected = spec["collation"].document
+            actual = index.get("collation") or {}
+            if any(actual.get(field) != value for field, value in expected.items()):
+                problems.append(f"{collection}: index '{spec['name']}' has collation {actual or None}")
+    return problems
+
+def plan_stages(plan):
+    """All stage names in an explain() plan tree (classic and SBE formats)"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+def check_query_plans(db):
+    """
+    Explain every hot query and flag those that scan the whole collection
+
+    Args:
+        db: MongoDB database connection
+
+    Returns:
+        list: {"query", "collection", "stages", "collscan"} per hot query
+    """
+    results = []
+    for description, collection, query, collation in HOT_QUERIES:
+        cursor = db[collection].find(query, {"_id": 1})
+        if collation is not None:
+            cursor = cursor.collation(collation)
+        winning = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        stages = plan_stages(winning)
+        results.append({
+            "query": description,
+            "collection": collection,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return results
+
+def migrate_and_verify(db, repair=False, explain=True):
+    """
+    Bring the database up to date and check indexes and query plans
+
+    Missing indexes (e.g. after a collection was dropped) are rebuilt by
+    re-running the migrations once before giving up.
+
+    Args:
+        db: MongoDB database connection
+        repair: Re-run every migration up front
+        explain: Also check the hot query plans
+
+    Returns:
+        dict: Applied versions, index problems and query plans
+
+    Raises:
+        MigrationError: If an index is still wrong or a hot query uses COLLSCAN
+    """
+    ran = migrate(db, repair=repair)
+    problems = verify_indexes(db)
+    if problems and not repair:
+        print(f"Index check failed ({'; '.join(problems)}), re-running migrations")
+        ran = migrate(db, repair=True)
+        problems = verify_indexes(db)
+
+    plans = check_query_plans(db) if explain else []
+    problems.extend(
+        f"{plan['collection']}: '{plan['query']}' falls back to COLLSCAN ({' > '.join(plan['stages'])})"
+        for plan in plans if plan["collscan"]
+    )
+
+    report = {
+        "schema_version": max(applied_versions(db), default=0),
+        "applied": ran,
+        "problems": problems,
+        "query_plans": plans,
+    }
+    if problems:
+        raise MigrationError("Database schema check failed:\n  " + "\n  ".join(problems))
+    return report
+
+# Outcome of the startup run in this process, for the health endpoint
+_startup_report = None
+
+def run_startup_migrations(db):
+    """
+    Migrate and verify at server startup, reporting failures loudly
+
+    A failed check does not stop the server (lookups are answered from the
+    in-memory catalog), but it is printed prominently and shown by
+    schema_status().
+
+    Args:
+        db: MongoDB database connection
+
+    Returns:
+        dict: Report from migrate_and_verify, or an error report
+    """
+    global _startup_report
+    try:
+        report = migrate_and_verify(db)
+        print(f"Database schema at version {report['schema_version']}, all indexes and query plans verified")
+    except (MigrationError, OperationFailure) as e:
+        print("!" * 72)
+        print(f"DATABASE MIGRATION CHECK FAILED: {str(e)}")
+        print("Run `python migrate.py --repair` to rebuild the indexes.")
+        print("!" * 72)
+        report = {"schema_version": None, "applied": [], "problems": [str(e)], "query_plans": []}
+    _startup_report = report
+    return report
+
+def schema_status():
+    """
+    Schema version and problems found at startup (None if migrations did not run)
+
+    Returns:
+        dict: {"schema_version", "applied", "problems"} or None
+    """
+    if _startup_report is None:
+        return None
+    return {key: _startup_report[key] for key in ("schema_version", "applied", "problems")}
@@ -0,0 +1,215 @@
+"""
+Perceptual-hash index for near-duplicate uploads.
+
+Each classified upload is reduced to a 64-bit difference hash (dHash, see
+utils.image_utils.dhash) and stored in a BK-tree keyed by Hamming
+distance. A new upload whose hash is within a configurable distance of a
+stored one reuses that prediction instead of running the CNN. This catches
+the same leaf photo resized or re-encoded by messaging apps.
+
+A 64-bit dHash is coarse: distinct photos with similar gradient structure
+can land a few bits apart, so the index is opt-in (PHASH_INDEX_ENABLED),
+the default distance is kept small and reused results are flagged as
+"near_duplicate" in the API response.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+# Additions between automatic background saves of a persisted index
+SAVE_EVERY = 1000
+
+def hamming(a, b):
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        self._root = None
+        self.size = 0
+
+    def add(self, item):
+        """Insert a hash (duplicates are ignored)"""
+        if self._root is None:
+            self._root = (item, {})
+            self.size = 1
+            return
+
+        node = self._root
+        while True:
+            distance = hamming(item, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = (item, {})
+                self.size += 1
+                return
+            node = child
+
+    def nearest(self, item, max_distance, valid=None):
+        """
+        Find the closest stored hash within max_distance
+
+        Args:
+            item: Hash to search for
+            max_distance: Largest Hamming distance accepted
+            valid: Optional container; hashes not in it are skipped
+
+        Returns:
+            tuple: (hash, distance) or None if nothing is close enough
+        """
+        if self._root is None:
+            return None
+
+        best = None
+        stack = [self._root]
+        while stack:
+            value, children = stack.pop()
+            distance = hamming(item, value)
+            usable = valid is None or value in valid
+            if usable and distance <= max_distance and (best is None or distance < best[1]):
+                best = (value, distance)
+                if distance == 0:
+                    break
+            limit = best[1] if best is not None else max_distance
+            for edge, child in children.items():
+                if distance - limit <= edge <= distance + limit:
+                    stack.append(child)
+        return best
+
+class PerceptualIndex:
+    """
+    Bounded near-duplicate index mapping perceptual hashes to predictions
+
+    The BK-tree is rebuilt from the retained entries whenever evictions
+    pile up, so memory stays bounded by max_entries.
+
+    Args:
+        version: Model version; entries from other versions are discarded on load
+        max_entries: Maximum number of hashes retained
+        max_distance: Largest Hamming distance treated as the same image
+        path: Optional file the index is persisted to
+    """
+
+    def __init__(self, version, max_entries=50000, max_distance=2, path=None):
+        self.version = version
+        self.max_entries = max(1, int(max_entries))
+        self.max_distance = int(max_distance)
+        self.path = path
+        self._entries = OrderedDict()
+        self._tree = BKTree()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._unsaved = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def lookup(self, phash):
+        """
+        Find a stored prediction for a perceptually similar image
+
+        Args:
+            phash: Hash from dhash()
+
+        Returns:
+            tuple: (prediction, confidence) or None if no near duplicate exists
+        """
+        with self._lock:
+            # Evicted hashes linger in the tree until the next rebuild
+            match = self._tree.nearest(phash, self.max_distance, valid=self._entries)
+            if match is not None:
+                self._entries.move_to_end(match[0])
+                self._hits += 1
+                return self._entries[match[0]]
+            self._misses += 1
+            return None
+
+    def add(self, phash, value):
+        """
+        Remember the prediction for a classified image
+
+        Args:
+            phash: Hash from dhash()
+            value: (prediction, confidence) tuple
+        """
+        with self._lock:
+            self._unsaved += 1
+            save_now = bool(self.path) and self._unsaved >= SAVE_EVERY
+            if save_now:
+                self._unsaved = 0
+
+            if phash not in self._entries:
+                self._tree.add(phash)
+            self._entries[phash] = tuple(value)
+            self._entries.move_to_end(phash)
+
+            if len(self._entries) > self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                # BK-trees do not support deletion; rebuild once evicted hashes reach a quarter of the tree
+                if self._tree.size > self.max_entries * 1.25:
+                    self._rebuild()
+
+        if save_now:
+            threading.Thread(target=self.save, name="phash-index-save", daemon=True).start()
+
+    def save(self):
+        """Persist the index to its path (no-op if no path is configured)"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = [[phash, name, confidence] for phash, (name, confidence) in self._entries.items()]
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": self.version, "entries": entries}, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load a previously saved index, ignoring it if the model version changed"""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load perceptual index: {str(e)}")
+            return
+
+        if data.get("version") != self.version:
+            print("Perceptual index was built for another model version, starting empty")
+            return
+
+        with self._lock:
+            self._entries = OrderedDict(
+                (phash, (name, confidence)) for phash, name, confidence in data["entries"][-self.max_entries:]
+            )
+            self._rebuild()
+        print(f"Perceptual index loaded with {len(self._entries)} hashes")
+
+    def stats(self):
+        """
+        Size and hit counters of the index
+
+        Returns:
+            dict: Index statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "max_distance": self.max_distance,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    def _rebuild(self):
+        tree = BKTree()
+        for phash in self._entries:
+            tree.add(phash)
+        self._tree = tree
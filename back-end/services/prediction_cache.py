@@ -0,0 +1,166 @@
+"""
+Content-addressed cache of prediction results.
+
+Results are keyed by a digest of the uploaded bytes plus the model version,
+so re-uploads of the exact same photo skip decoding and inference. The
+in-process tier is an LRU with size and TTL eviction; an optional SQLite
+tier keeps results across restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Number of disk writes between sweeps of expired rows
+PRUNE_EVERY = 256
+
+def model_version(model_path):
+    """
+    Fingerprint a model file so cached results are tied to its weights
+
+    Args:
+        model_path: Path to the model file
+
+    Returns:
+        str: Short hex digest of the file contents (or 'none' if missing)
+    """
+    if not model_path or not os.path.exists(model_path):
+        return "none"
+
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+class PredictionCache:
+    """
+    Two-tier LRU/TTL cache of (prediction, confidence) results
+
+    Args:
+        version: Model version mixed into every key
+        max_entries: Maximum number of results kept in memory
+        ttl: Seconds a result stays valid
+        disk_path: Optional SQLite file for the persistent tier
+    """
+
+    def __init__(self, version, max_entries=1024, ttl=3600.0, disk_path=None):
+        self.version = version
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._disk_writes = 0
+
+        self._disk = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS predictions (key TEXT PRIMARY KEY, value TEXT, stored_at REAL)"
+            )
+            self._disk.commit()
+
+    def key_for(self, image_bytes):
+        """
+        Compute the cache key for an upload
+
+        Args:
+            image_bytes (bytes): Raw file contents
+
+        Returns:
+            str: Hex digest of the bytes and model version
+        """
+        digest = hashlib.blake2b(image_bytes, digest_size=20)
+        digest.update(self.version.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Look up a cached result
+
+        Args:
+            key: Key from key_for()
+
+        Returns:
+            tuple: (prediction, confidence) or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, stored_at FROM predictions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] <= self.ttl:
+                    value = tuple(json.loads(row[0]))
+                    self._store_memory(key, value, row[1])
+                    self._disk_hits += 1
+                    return value
+
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        """
+        Store a result in both tiers
+
+        Args:
+            key: Key from key_for()
+            value: (prediction, confidence) tuple
+        """
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, tuple(value), now)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO predictions (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(list(value)), now)
+                )
+                self._disk_writes += 1
+                # Expired rows are pruned periodically rather than on every write
+                if self._disk_writes % PRUNE_EVERY == 0:
+                    self._disk.execute("DELETE FROM predictions WHERE stored_at < ?", (now - self.ttl,))
+                self._disk.commit()
+
+    def stats(self):
+        """
+        Hit/miss counters and size of the cache
+
+        Returns:
+            dict: Cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "persistent": self._disk is not None,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits + self._disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def _store_memory(self, key, value, stored_at):
+        if self.max_entries == 0:
+            return
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -1,76 +1,372 @@
-import cv2
+import os
+import threading
+import time
 import numpy as np
-import tensorflow as tf
 from config import Config, CLASSES
-from tensorflow.keras.preprocessing import image
-from tensorflow.keras.applications.inception_v3 import preprocess_input
+# Preprocessing lives in utils.image_utils; re-exported for older callers
+# (it returns uint8 pixels, which predict_probabilities normalizes for bare models)
+from utils.image_utils import preprocess_image  # noqa: F401
+from utils.image_utils import float_to_pixels, pixels_to_float
+from utils.tracing import traced
 
-def preprocess_image(image_path):
+def import_tensorflow():
     """
-    Preprocess image for prediction using the correct dimensions and format
-    for the AyurVignana_prediction_cnn_.h5 model.
+    Import TensorFlow on first use
+    
+    TensorFlow takes seconds to import, so it is only pulled in by the
+    backends that need it (never by modules imported at server start).
+    
+    Returns:
+        module: The tensorflow module
+    """
+    import tensorflow as tf
+    tf.get_logger().setLevel('ERROR')
+    
+    # Thread pools can only be sized before the TF runtime starts
+    try:
+        if Config.INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(Config.INTRA_OP_THREADS)
+        if Config.INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(Config.INTER_OP_THREADS)
+    except RuntimeError:
+        pass
+    return tf
+
+@traced("predict_herb")
+def predict_herb(model, preprocessed_image):
+    """
+    Predict herb from preprocessed image using the loaded model
     
     Args:
-        image_path (str): Path to the image file
+        model: Inference backend from load_inference_backend() (a bare
+            Keras model also works, see predict_probabilities)
+        preprocessed_image: uint8 pixels from preprocess_image()
         
     Returns:
-        numpy.ndarray: Preprocessed image ready for model prediction
+        tuple: (predicted_herb_name, confidence_percentage)
     """
-    try:
-        # Load image
-        img = cv2.imread(image_path)
-        if img is None:
-            raise ValueError(f"Could not read image at {image_path}")
+    return predict_herbs(model, preprocessed_image)[0]
+
+@traced("predict_herbs")
+def predict_herbs(model, preprocessed_batch):
+    """
+    Predict herbs for a batch of preprocessed images with a single forward pass
+    
+    Args:
+        model: Inference backend (or any object with a Keras-style predict)
+        preprocessed_batch: Numpy array of shape (N, height, width, 3)
         
-        # Get original dimensions for debugging
-        original_height, original_width, channels = img.shape
-        print(f"Original image shape: {img.shape}")
+    Returns:
+        list: One (predicted_herb_name, confidence_percentage) tuple per image
+    """
+    return label_predictions(predict_probabilities(model, preprocessed_batch))
+
+def predict_probabilities(model, preprocessed_batch):
+    """
+    Run one forward pass and return the class probabilities
+    
+    Args:
+        model: Inference backend, which takes uint8 pixels; any other object
+            with a Keras-style predict (e.g. load_model() on the .h5) is
+            given the batch normalized to the [0, 1] floats it was trained on
+        preprocessed_batch: Numpy array of shape (N, height, width, 3)
         
-        # Resize to match the CNN model's expected input
-        # For CNN models, this is typically 224x224
-        img = cv2.resize(img, Config.IMG_SIZE)
-        print(f"Resized to: {img.shape}")
+    Returns:
+        numpy.ndarray: Probabilities of shape (N, len(CLASSES))
+    """
+    if not isinstance(model, tuple(INFERENCE_BACKENDS.values())):
+        preprocessed_batch = pixels_to_float(preprocessed_batch)
+    try:
+        # Make prediction (every inference backend shares this call)
+        return np.asarray(model.predict(preprocessed_batch))
+    except Exception as e:
+        print(f"Error during prediction: {str(e)}")
+        raise Exception(f"Prediction failed: {str(e)}")
+
+def label_predictions(probabilities):
+    """
+    Turn class probabilities into the top-1 class of every row
+    
+    Args:
+        probabilities: Array of shape (N, len(CLASSES))
         
-        # Convert BGR to RGB (since model was likely trained on RGB)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    Returns:
+        list: One (predicted_herb_name, confidence_percentage) tuple per row
+    """
+    # Get the predicted class index and confidence for every row
+    predicted_class_indices = np.argmax(probabilities, axis=1)
+    confidences = probabilities[np.arange(len(probabilities)), predicted_class_indices] * 100
+    
+    # Get the predicted class names
+    return [
+        (CLASSES[int(class_index)], float(confidence))
+        for class_index, confidence in zip(predicted_class_indices, confidences)
+    ]
+
+def top_k_predictions(probabilities, k):
+    """
+    The k most likely classes of every row, best first
+    
+    Uses a partial sort (argpartition) over the whole batch, so only the k
+    selected entries per row are fully sorted.
+    
+    Args:
+        probabilities: Array of shape (N, len(CLASSES))
+        k: Number of candidates per row
         
-        # Scale pixel values to [0, 1]
-        img = img.astype(np.float32) / 255.0
+    Returns:
+        list: One list of (class_index, class_name, confidence_percentage)
+            tuples per row
+    """
+    k = max(1, min(int(k), probabilities.shape[1]))
+    if k < probabilities.shape[1]:
+        top = np.argpartition(-probabilities, k - 1, axis=1)[:, :k]
+    else:
+        top = np.tile(np.arange(probabilities.shape[1]), (len(probabilities), 1))
+    top_probabilities = np.take_along_axis(probabilities, top, axis=1)
+    order = np.argsort(-top_probabilities, axis=1)
+    top = np.take_along_axis(top, order, axis=1)
+    top_probabilities = np.take_along_axis(top_probabilities, order, axis=1) * 100
+    
+    return [
+        [(int(index), CLASSES[int(index)], float(confidence)) for index, confidence in zip(indices, confidences)]
+        for indices, confidences in zip(top, top_probabilities)
+    ]
+
+class KerasBackend:
+    """
+    Runs the original .h5 model as a graph-compiled serving function
+    
+    model.predict() rebuilds its data-adapter machinery on every call; the
+    tf.function below is traced once for a fixed input signature (any batch
+    size of IMG_SIZE RGB uint8 images) and reused for every request. Models
+    trained on float inputs get the scaling to [0, 1] compiled into that
+    function, so it runs fused with the first layers instead of in NumPy.
+    
+    Args:
+        model_path: Path to the .h5 model file
+        batch_sizes: Batch shapes that are warmed up (see serving_batch_sizes);
+            with XLA on, every batch is padded up to one of them
+    """
+    name = "keras"
+    
+    def __init__(self, model_path, batch_sizes=None):
+        tf = import_tensorflow()
+        self._tf = tf
+        self.model = tf.keras.models.load_model(model_path)
         
-        # Add batch dimension
-        img = np.expand_dims(img, axis=0)
+        height, width = Config.IMG_SIZE[1], Config.IMG_SIZE[0]
+        signature = [tf.TensorSpec(shape=(None, height, width, 3), dtype=tf.uint8, name="pixels")]
+        if tf.as_dtype(self.model.inputs[0].dtype) == tf.uint8:
+            # Exported with in-graph preprocessing (convert_model.py)
+            serve = lambda pixels: self.model(pixels, training=False)
+        else:
+            serve = lambda pixels: self.model(tf.cast(pixels, tf.float32) / 255.0, training=False)
+        self._serve = tf.function(
+            serve,
+            input_signature=signature,
+            jit_compile=Config.XLA_COMPILE
+        )
+        # XLA compiles one program per concrete shape, so batches are padded up to a warmed size
+        self.padded_sizes = sorted(batch_sizes or serving_batch_sizes()) if Config.XLA_COMPILE else []
+    
+    def predict(self, batch):
+        batch = float_to_pixels(batch)
+        count = len(batch)
+        target = next((size for size in self.padded_sizes if size >= count), count)
+        if target != count:
+            padding = np.zeros((target - count,) + batch.shape[1:], dtype=batch.dtype)
+            batch = np.concatenate([batch, padding], axis=0)
+        return self._serve(self._tf.convert_to_tensor(batch, dtype=self._tf.uint8)).numpy()[:count]
+
+class OnnxBackend:
+    """
+    Runs an exported ONNX model with ONNX Runtime on the CPU
+    
+    Exports with in-graph preprocessing take uint8 pixels as they are;
+    older float-input exports get them normalized here first.
+    
+    Args:
+        model_path: Path to the .onnx model file
+    """
+    name = "onnx"
+    
+    def __init__(self, model_path, intra_op_threads=Config.INTRA_OP_THREADS, inter_op_threads=Config.INTER_OP_THREADS):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("onnxruntime is required for INFERENCE_ENGINE='onnx' (pip install onnxruntime)")
         
-        print(f"Preprocessed image shape: {img.shape}")
-        return img
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.takes_pixels = model_input.type == "tensor(uint8)"
+    
+    def predict(self, batch):
+        batch = float_to_pixels(batch) if self.takes_pixels else pixels_to_float(batch)
+        return self.session.run(None, {self.input_name: batch})[0]
 
-    except Exception as e:
-        print(f"Error preprocessing image: {str(e)}")
-        raise
+class TFLiteBackend:
+    """
+    Runs an exported TFLite flatbuffer with the TFLite interpreter
+    
+    Args:
+        model_path: Path to the .tflite model file
+    """
+    name = "tflite"
+    
+    def __init__(self, model_path, num_threads=Config.INTRA_OP_THREADS or None):
+        tf = import_tensorflow()
+        self.interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.output_index = self.output_detail["index"]
+        self.batch_size = int(self.input_detail["shape"][0])
+        self._lock = threading.Lock()
+    
+    def predict(self, batch):
+        with self._lock:
+            # Resizing re-plans the interpreter, so it only happens when the batch size changes
+            if len(batch) != self.batch_size:
+                self.interpreter.resize_tensor_input(self.input_detail["index"], batch.shape)
+                self.interpreter.allocate_tensors()
+                self.batch_size = len(batch)
+            self.interpreter.set_tensor(self.input_detail["index"], self._quantize(batch))
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self.output_index))
+    
+    def _quantize(self, batch):
+        """Map pixels onto the model's input tensor (raw, float or quantized int8)"""
+        dtype = self.input_detail["dtype"]
+        scale, zero_point = self.input_detail["quantization"]
+        if dtype == np.uint8 and not scale:
+            # Unquantized uint8 input: exported with in-graph preprocessing
+            return float_to_pixels(batch)
+        
+        batch = pixels_to_float(batch)
+        if np.issubdtype(dtype, np.integer):
+            info = np.iinfo(dtype)
+            return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+        return batch.astype(dtype, copy=False)
+    
+    def _dequantize(self, output):
+        """Map an integer output tensor back to float probabilities"""
+        if np.issubdtype(output.dtype, np.integer):
+            scale, zero_point = self.output_detail["quantization"]
+            return (output.astype(np.float32) - zero_point) * scale
+        return output.copy()
 
-def predict_herb(model, preprocessed_image):
+def serving_batch_sizes(max_batch_size=None):
     """
-    Predict herb from preprocessed image using the loaded model
+    Batch shapes the server warms up and, with XLA, pads batches to
+    
+    The configured WARMUP_BATCH_SIZES up to the largest batch the scheduler
+    forms, plus that largest size itself, so every batch it can run has a
+    warmed shape to pad to.
     
     Args:
-        model: Loaded Keras model
-        preprocessed_image: Numpy array of preprocessed image
+        max_batch_size: Largest batch per forward pass (defaults to BATCH_MAX_SIZE)
         
     Returns:
-        tuple: (predicted_herb_name, confidence_percentage)
+        list: Sorted batch sizes
     """
-    try:
-        # Make prediction
-        predictions = model.predict(preprocessed_image)
+    max_batch_size = max(1, max_batch_size or Config.BATCH_MAX_SIZE)
+    sizes = {size for size in Config.WARMUP_BATCH_SIZES if 0 < size <= max_batch_size}
+    sizes.add(max_batch_size)
+    return sorted(sizes)
+
+def warmup_backend(backend, batch_sizes):
+    """
+    Run synthetic batches through a backend so no request pays for tracing,
+    kernel selection or buffer allocation
+    
+    Args:
+        backend: Loaded inference backend
+        batch_sizes: Batch sizes the server is expected to run
         
-        # Get the predicted class index and confidence
-        predicted_class_index = np.argmax(predictions[0])
-        confidence = float(predictions[0][predicted_class_index] * 100)
+    Returns:
+        dict: Warmup time in milliseconds per batch size
+    """
+    height, width = Config.IMG_SIZE[1], Config.IMG_SIZE[0]
+    timings = {}
+    for batch_size in sorted(set(batch_sizes)):
+        started = time.perf_counter()
+        backend.predict(np.zeros((batch_size, height, width, 3), dtype=np.uint8))
+        timings[batch_size] = (time.perf_counter() - started) * 1000.0
+        print(f"Warmed up batch size {batch_size} in {timings[batch_size]:.1f} ms")
+    return timings
+
+INFERENCE_BACKENDS = {
+    "keras": KerasBackend,
+    "onnx": OnnxBackend,
+    "tflite": TFLiteBackend,
+}
+
+def engine_for_path(model_path):
+    """
+    Infer the inference engine from a model file extension
+    
+    Args:
+        model_path: Path to a .h5/.keras, .onnx or .tflite file
         
-        # Get the predicted class name
-        predicted_herb = CLASSES[predicted_class_index]
+    Returns:
+        str: 'keras', 'onnx' or 'tflite'
+    """
+    extension = os.path.splitext(model_path)[1].lower()
+    return {".onnx": "onnx", ".tflite": "tflite"}.get(extension, "keras")
+
+def model_path_for_engine(engine=None):
+    """
+    Model file served by an inference engine
+    
+    Args:
+        engine: 'auto', 'keras', 'onnx' or 'tflite' (defaults to Config.INFERENCE_ENGINE)
         
-        return predicted_herb, confidence
+    Returns:
+        str: Path from Config for that engine
+    """
+    engine = (engine or Config.INFERENCE_ENGINE).lower()
+    return {
+        "auto": Config.MODEL_PATH,
+        "keras": Config.MODEL_PATH,
+        "onnx": Config.ONNX_MODEL_PATH,
+        "tflite": Config.TFLITE_MODEL_PATH,
+    }.get(engine)
+
+def load_inference_backend(engine=None, model_path=None, batch_sizes=None):
+    """
+    Load the inference engine selected in Config
+    
+    Args:
+        engine: 'auto', 'keras', 'onnx' or 'tflite' (defaults to Config.INFERENCE_ENGINE);
+            'auto' picks the engine from the model file extension
+        model_path: Model file for that engine (defaults to the Config path for it)
+        batch_sizes: Batch shapes that will be warmed up (defaults to
+            serving_batch_sizes()); the Keras backend pads to them under XLA
         
-    except Exception as e:
-        print(f"Error during prediction: {str(e)}")
-        raise Exception(f"Prediction failed: {str(e)}")
\ No newline at end of file
+    Returns:
+        Backend instance exposing predict(batch) -> probabilities
+    """
+    engine = (engine or Config.INFERENCE_ENGINE).lower()
+    if model_path is None:
+        model_path = model_path_for_engine(engine)
+    if engine == "auto" and model_path is not None:
+        engine = engine_for_path(model_path)
+    
+    if engine not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference engine '{engine}' (expected one of auto, {', '.join(INFERENCE_BACKENDS)})")
+    
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found at {model_path}")
+    
+    if engine == "keras":
+        backend = KerasBackend(model_path, batch_sizes=batch_sizes)
+    else:
+        backend = INFERENCE_BACKENDS[engine](model_path)
+    print(f"Loaded {engine} inference backend from {model_path}")
+    return backend
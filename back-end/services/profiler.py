@@ -0,0 +1,146 @@
+"""
+On-demand sampling profiler.
+
+While active, the thread that requested the profile snapshots the Python
+stack of every other thread at a fixed interval (sys._current_frames) and counts identical
+stacks. Nothing is hooked into the interpreter, so the overhead is one
+stack walk per thread per interval and zero when the profiler is off.
+
+Profiles are returned in the folded-stack format ("frame;frame;frame N"
+per line) read by flamegraph.pl, speedscope and inferno. Threads that are
+only waiting (idle server threads, empty queues) are left out by default so
+the flame graph shows where CPU goes.
+"""
+import os
+import sys
+import threading
+import time
+
+from config import Config
+
+# Innermost Python frames that mean a thread is parked rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("socketserver.py", "serve_forever"),
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+    ("collection_watcher.py", "run"),
+    ("upload_storage.py", "run"),
+}
+
+def _frame_label(frame):
+    code = frame.f_code
+    # Labelled by function rather than line so samples in one function merge
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame):
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+class SamplingProfiler:
+    """
+    Statistical profiler of all threads in the process
+
+    Args:
+        interval_ms: Milliseconds between samples
+    """
+
+    def __init__(self, interval_ms=5.0):
+        self.interval = max(0.5, float(interval_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._running = False
+        self._requests = 0
+
+    @property
+    def running(self):
+        return self._running
+
+    def request_finished(self):
+        """Count a completed request (profiles can stop after N requests)"""
+        if self._running:
+            with self._lock:
+                self._requests += 1
+
+    def profile(self, seconds, max_requests=None, include_idle=False):
+        """
+        Sample every thread until the time limit or request count is reached
+
+        Blocks the calling thread for the duration of the profile.
+
+        Args:
+            seconds: Longest time to profile
+            max_requests: Stop early after this many requests finished
+            include_idle: Keep stacks of threads that are only waiting
+
+        Returns:
+            dict: Folded stacks ({stack: samples}) and profile metadata
+        """
+        with self._lock:
+            if self._running:
+                raise RuntimeError("A profile is already running")
+            self._running = True
+            self._requests = 0
+
+        own_thread = threading.get_ident()
+        names = {}
+        stacks = {}
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        try:
+            while time.perf_counter() < deadline:
+                if max_requests and self._requests >= max_requests:
+                    break
+
+                for thread in threading.enumerate():
+                    names.setdefault(thread.ident, thread.name)
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    if not include_idle and _is_idle(frame):
+                        continue
+
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame))
+                        frame = frame.f_back
+                    labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                    stack = ";".join(reversed(labels))
+                    stacks[stack] = stacks.get(stack, 0) + 1
+                samples += 1
+
+                time.sleep(self.interval)
+        finally:
+            with self._lock:
+                self._running = False
+                requests = self._requests
+
+        return {
+            "duration_seconds": round(time.perf_counter() - started, 3),
+            "samples": samples,
+            "interval_ms": self.interval * 1000.0,
+            "requests": requests,
+            "stacks": stacks,
+        }
+
+def folded(profile):
+    """
+    Render a profile as folded stacks for flame graph tools
+
+    Args:
+        profile: Result of SamplingProfiler.profile()
+
+    Returns:
+        str: One "frame;frame;frame count" line per distinct stack
+    """
+    lines = [f"{stack} {count}" for stack, count in sorted(profile["stacks"].items(), key=lambda item: -item[1])]
+    return "\n".join(lines) + "\n"
+
+# Shared profiler for the process
+profiler = SamplingProfiler(interval_ms=Config.PROFILER_INTERVAL_MS)
@@ -0,0 +1,150 @@
+"""
+Cache of /api/recommend results keyed on the canonicalized symptom text.
+
+Most recommendation traffic repeats a few hundred phrasings, so results
+are kept in an LRU with TTL eviction. Each entry is tagged with the
+version of the symptom matcher that produced it; when the recommendations
+collection changes and the matcher is rebuilt, the version moves on and
+every older entry is dropped.
+
+Keys are the lowercased text with whitespace collapsed. Tokens are not
+sorted: the matcher looks for phrases ("joint pain", "tension headache"),
+so "joint pain" and "pain joint" can have different answers.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from services.symptom_matcher import matcher
+
+def canonical_symptoms(symptoms_text):
+    """
+    Canonical form of a symptom query, used both as cache key and match text
+
+    Args:
+        symptoms_text: Symptom text as sent by the client
+
+    Returns:
+        str: Lowercased text with runs of whitespace collapsed to one space
+    """
+    return " ".join(str(symptoms_text).lower().split())
+
+class RecommendationCache:
+    """
+    LRU/TTL cache of recommendation lists, invalidated by matcher version
+
+    Args:
+        max_entries: Maximum number of queries kept (0 disables the cache)
+        ttl: Seconds a result stays valid
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, key, version):
+        """
+        Look up a cached result
+
+        Args:
+            key: Canonical symptom text
+            version: Current matcher version
+
+        Returns:
+            list: Recommended herbs (treat as read-only) or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key, version, value):
+        """
+        Store a result computed by the given matcher version
+
+        Args:
+            key: Canonical symptom text
+            version: Matcher version the result was computed with
+            value: List of recommended herbs
+        """
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            if version != self._version:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Hit/miss counters and size of the cache
+
+        Returns:
+            dict: Cache statistics
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "matcher_version": self._version,
+                "invalidations": self._invalidations,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
+
+    def _check_version(self, version):
+        # Only a newer matcher replaces the cached generation; a result computed
+        # by an older one (a rebuild finished mid-request) is simply not stored
+        if self._version is None or version > self._version:
+            if self._entries:
+                self._invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+def lookup_recommendations(symptoms_text):
+    """
+    Recommend herbs from the cache, falling back to the symptom matcher
+
+    The caller is responsible for the matcher being loaded (ensure_fresh).
+
+    Args:
+        symptoms_text: Symptom text as sent by the client
+
+    Returns:
+        list: Recommended herbs (shared with the cache; treat as read-only)
+    """
+    key = canonical_symptoms(symptoms_text)
+    version = matcher.version
+    herbs = recommendation_cache.get(key, version)
+    if herbs is None:
+        herbs = matcher.lookup(key)
+        recommendation_cache.put(key, version, herbs)
+    return herbs
+
+# Shared cache for the process
+recommendation_cache = RecommendationCache(
+    max_entries=Config.RECOMMENDATION_CACHE_SIZE,
+    ttl=Config.RECOMMENDATION_CACHE_TTL
+)
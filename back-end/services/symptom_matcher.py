@@ -0,0 +1,253 @@
+"""
+Precompiled symptom matcher for herb recommendations.
+
+Every symptom and related term in the recommendations collection is
+compiled into an Aho-Corasick automaton, so matching a query is a single
+pass over the symptom text regardless of how many terms are loaded. The
+automaton is rebuilt in the background when its TTL expires or when the
+collection changes.
+"""
+import threading
+import time
+
+from config import Config
+from services.collection_watcher import watch_collection
+
+RECOMMENDATION_PROJECTION = {"_id": 0, "symptom": 1, "related_terms": 1, "herbs": 1}
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher
+
+    Args:
+        patterns: Iterable of (pattern, value) pairs; value is reported for
+            every occurrence of pattern in the searched text
+    """
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+
+        for pattern, value in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(set())
+                state = next_state
+            self._output[state].add(value)
+
+        # Breadth-first pass to link failure transitions and merge outputs
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def search(self, text):
+        """
+        Find every value whose pattern occurs in text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            set: Values of all matched patterns
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        found = set()
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+
+        return found
+
+class SymptomMatcher:
+    """
+    Recommendation lookup backed by a precompiled automaton
+
+    Args:
+        ttl: Seconds before the compiled matcher is considered stale
+    """
+
+    def __init__(self, ttl=300.0):
+        self.ttl = ttl
+        self.version = 0
+        self._recommendations = []
+        self._automaton = AhoCorasick([])
+        self._db = None
+        self._loaded_at = None
+        self._stale = False
+        self._refreshing = False
+        self._watcher = None
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        """
+        Compile the matcher from the recommendations collection
+
+        Args:
+            db: MongoDB database connection
+
+        Returns:
+            int: Number of recommendation sets compiled
+        """
+        self.begin_load()
+        count = self.install(self.build(db.recommendations.find({}, RECOMMENDATION_PROJECTION)))
+        self._db = db
+        return count
+
+    def begin_load(self):
+        """Mark the matcher fresh before fetching, so a change arriving mid-load triggers another rebuild"""
+        self._stale = False
+
+    def build(self, documents):
+        """
+        Compile an automaton from already-fetched recommendation documents
+
+        Does not touch the live matcher. The async service fetches with its
+        own driver and runs this off the event loop, then swaps the result in
+        with install().
+
+        Args:
+            documents: Iterable of recommendation documents
+
+        Returns:
+            tuple: (recommendations, automaton, number of terms)
+        """
+        recommendations = list(documents)
+
+        patterns = []
+        for index, rec in enumerate(recommendations):
+            patterns.append((rec["symptom"].lower(), index))
+            for term in rec.get("related_terms", []):
+                patterns.append((term.lower(), index))
+        return recommendations, AhoCorasick(patterns), len(patterns)
+
+    def install(self, compiled):
+        """
+        Replace the live matcher with one returned by build()
+
+        Args:
+            compiled: (recommendations, automaton, number of terms)
+
+        Returns:
+            int: Number of recommendation sets compiled
+        """
+        recommendations, automaton, term_count = compiled
+        with self._lock:
+            self._recommendations = recommendations
+            self._automaton = automaton
+            self._loaded_at = time.monotonic()
+            # Lets result caches (see services.recommendation_cache) drop stale answers
+            self.version += 1
+
+        print(f"Symptom matcher compiled with {term_count} terms from {len(recommendations)} recommendation sets")
+        return len(recommendations)
+
+    def watch(self, db):
+        """Rebuild the matcher whenever the recommendations collection changes"""
+        if self._watcher is None:
+            self._watcher = watch_collection(db.recommendations, self.invalidate)
+
+    def invalidate(self):
+        """Mark the matcher stale so the next query triggers a rebuild"""
+        self._stale = True
+
+    def match(self, db, symptoms_text):
+        """
+        Recommend herbs for the symptoms mentioned in the text
+
+        Args:
+            db: MongoDB database connection used if a (re)build is needed
+            symptoms_text: Lowercased text containing user symptoms
+
+        Returns:
+            list: Unique herbs from every matching recommendation set, in
+                collection order
+        """
+        self.ensure_fresh(db)
+        return self.lookup(symptoms_text)
+
+    def ensure_fresh(self, db):
+        """
+        Build the matcher on first use and rebuild it in the background once stale
+
+        Args:
+            db: MongoDB database connection used if a (re)build is needed
+        """
+        if self._loaded_at is None:
+            if db is not None:
+                self.load(db)
+        elif self.needs_refresh():
+            self._refresh_in_background(db if db is not None else self._db)
+
+    def is_loaded(self):
+        """Whether the matcher has been loaded at least once"""
+        return self._loaded_at is not None
+
+    def needs_refresh(self):
+        """Whether the matcher was never built, was invalidated, or is past its TTL"""
+        return self._loaded_at is None or self._stale or time.monotonic() - self._loaded_at > self.ttl
+
+    def lookup(self, symptoms_text):
+        """
+        Match against the compiled automaton without any refresh check
+
+        Args:
+            symptoms_text: Lowercased text containing user symptoms
+
+        Returns:
+            list: Unique herbs from every matching recommendation set
+        """
+        with self._lock:
+            recommendations = self._recommendations
+            automaton = self._automaton
+
+        herbs = []
+        seen = set()
+        for index in sorted(automaton.search(symptoms_text)):
+            for herb in recommendations[index]["herbs"]:
+                if herb["name"] not in seen:
+                    seen.add(herb["name"])
+                    herbs.append(herb)
+
+        return herbs
+
+    def _refresh_in_background(self, db):
+        with self._lock:
+            if self._refreshing or db is None:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                self.load(db)
+            except Exception as e:
+                print(f"Error rebuilding symptom matcher: {str(e)}")
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="symptom-matcher-refresh", daemon=True).start()
+
+# Shared matcher for the process
+matcher = SymptomMatcher(ttl=Config.SYMPTOM_MATCHER_TTL)
@@ -0,0 +1,274 @@
+"""
+Optional, decoupled persistence of uploaded images.
+
+Prediction works entirely on the in-memory upload; writing the original
+file to UPLOAD_FOLDER happens on a small background pool, overlapping the
+rest of the request. Routes wait for the write to finish before returning
+the file's URL, so a client can fetch it straight away. At most
+UPLOAD_WRITE_QUEUE writes are pending at once; beyond that the caller
+writes the file itself rather than holding more image bytes in memory.
+
+Files are sharded two levels deep by a hash of their name
+(UPLOAD_FOLDER/ab/cd/<uuid>.<ext>), so no directory grows past a few
+hundred entries even with millions of uploads. Files written by older
+versions directly into UPLOAD_FOLDER are still found. A retention sweep
+removes uploads past UPLOAD_RETENTION_DAYS and then the oldest ones until
+the folder fits in UPLOAD_MAX_TOTAL_MB.
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from config import Config
+from services.metrics import PIPELINE_STAGE_SECONDS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Name of the lock file that elects a single retention sweeper among workers
+GC_LOCK_NAME = ".retention.lock"
+# Temporary files older than this are leftovers of interrupted writes
+TMP_GRACE_SECONDS = 3600
+
+_executor = ThreadPoolExecutor(max_workers=Config.UPLOAD_WRITER_THREADS, thread_name_prefix="upload-writer")
+# Free slots in the writer queue (bounds the image bytes held in memory)
+_write_slots = threading.Semaphore(max(1, Config.UPLOAD_WRITE_QUEUE))
+_gc_thread = None
+_gc_lock_file = None
+_gc_stats = {}
+
+def _shard_dir(filename):
+    digest = hashlib.md5(filename.encode("utf-8")).hexdigest()
+    return os.path.join(Config.UPLOAD_FOLDER, digest[:2], digest[2:4])
+
+def _is_valid_name(filename):
+    return bool(filename) and filename not in (".", "..") and "/" not in filename and "\\" not in filename \
+        and not filename.startswith(".") and not filename.endswith(".tmp")
+
+def upload_path(filename):
+    """
+    Location an upload is stored at
+
+    Args:
+        filename (str): Name returned by save_upload()
+
+    Returns:
+        str: Absolute path, or None if the name could escape UPLOAD_FOLDER
+    """
+    if not _is_valid_name(filename):
+        return None
+    return os.path.join(_shard_dir(filename), filename)
+
+def find_upload(filename):
+    """
+    Find a stored upload, including ones saved before sharding
+
+    Args:
+        filename (str): Name returned by save_upload()
+
+    Returns:
+        str: Path of the existing file, or None if it does not exist
+    """
+    path = upload_path(filename)
+    if path is None:
+        return None
+    if os.path.isfile(path):
+        return path
+    legacy_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+    return legacy_path if os.path.isfile(legacy_path) else None
+
+def _write_file(file_path, image_bytes):
+    # Written under a temporary name so a partial file is never served
+    tmp_path = f"{file_path}.tmp"
+    try:
+        with PIPELINE_STAGE_SECONDS.time(endpoint="background", stage="file_write"):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, file_path)
+        return True
+    except OSError as e:
+        print(f"Error saving file: {str(e)}")
+        return False
+
+def save_upload(image_bytes, extension):
+    """
+    Start writing an uploaded image to UPLOAD_FOLDER
+
+    The write runs on the writer pool so the caller can carry on; pass the
+    result to wait_for_upload() before handing the URL to a client. When the
+    writer queue is full the file is written in the calling thread instead.
+
+    Args:
+        image_bytes (bytes): Raw file contents
+        extension (str): File extension without the dot
+
+    Returns:
+        tuple: (generated filename, Future resolving to True once the file is stored)
+    """
+    filename = f"{uuid.uuid4()}.{extension}"
+    file_path = upload_path(filename)
+
+    if not _write_slots.acquire(blocking=False):
+        future = Future()
+        future.set_result(_write_file(file_path, image_bytes))
+        return filename, future
+
+    future = _executor.submit(_write_file, file_path, image_bytes)
+    future.add_done_callback(lambda _: _write_slots.release())
+    return filename, future
+
+def wait_for_upload(pending, timeout=None):
+    """
+    Wait for a write started by save_upload() to finish
+
+    Args:
+        pending: (filename, future) returned by save_upload()
+        timeout: Seconds to wait (None waits indefinitely)
+
+    Returns:
+        str: The filename, or None if the file was not stored in time
+    """
+    filename, future = pending
+    try:
+        return filename if future.result(timeout=timeout) else None
+    except FutureTimeout:
+        print(f"Timed out saving upload {filename}")
+        return None
+
+def collect_garbage(max_age=None, max_total_bytes=None):
+    """
+    Apply the retention policy to UPLOAD_FOLDER
+
+    Uploads older than max_age are removed first; if the remaining files
+    still exceed max_total_bytes, the oldest are removed until they fit.
+
+    Args:
+        max_age: Seconds an upload is kept (None or 0 keeps them forever)
+        max_total_bytes: Size budget for all uploads (None or 0 is unlimited)
+
+    Returns:
+        dict: Files scanned, files and bytes removed, bytes retained
+    """
+    now = time.time()
+    files = []
+    scanned = 0
+    removed = 0
+    freed = 0
+
+    for dirpath, _, names in os.walk(Config.UPLOAD_FOLDER):
+        for name in names:
+            if name == GC_LOCK_NAME:
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            scanned += 1
+
+            age = now - stat.st_mtime
+            expired = bool(max_age) and age > max_age
+            abandoned = name.endswith(".tmp") and age > TMP_GRACE_SECONDS
+            if expired or abandoned:
+                if _remove(path):
+                    removed += 1
+                    freed += stat.st_size
+            elif not name.endswith(".tmp"):
+                files.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in files)
+    if max_total_bytes and total > max_total_bytes:
+        files.sort()
+        for _, size, path in files:
+            if total <= max_total_bytes:
+                break
+            if _remove(path):
+                removed += 1
+                freed += size
+                total -= size
+
+    return {
+        "scanned_files": scanned,
+        "removed_files": removed,
+        "freed_bytes": freed,
+        "retained_bytes": total,
+    }
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
+
+def _try_lock_sweeper():
+    """Take the sweeper lock without blocking (one sweeper across processes)"""
+    global _gc_lock_file
+
+    if fcntl is None or _gc_lock_file is not None:
+        return True
+    os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
+    lock_file = open(os.path.join(Config.UPLOAD_FOLDER, GC_LOCK_NAME), "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+    # Held for the life of the process
+    _gc_lock_file = lock_file
+    return True
+
+def start_retention_gc():
+    """
+    Start the background retention sweep if a retention policy is configured
+
+    Safe to call from every worker: only the process holding the sweeper lock
+    runs sweeps, and another one takes over if it exits.
+
+    Returns:
+        threading.Thread: The sweeper thread, or None if no policy is configured
+    """
+    global _gc_thread
+
+    max_age = Config.UPLOAD_RETENTION_DAYS * 24 * 3600
+    max_total_bytes = int(Config.UPLOAD_MAX_TOTAL_MB * 1024 * 1024)
+    if not max_age and not max_total_bytes:
+        return None
+    if _gc_thread is not None:
+        return _gc_thread
+
+    def run():
+        while True:
+            try:
+                if _try_lock_sweeper():
+                    started = time.perf_counter()
+                    result = collect_garbage(max_age, max_total_bytes)
+                    result["duration_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+                    result["finished_at"] = time.time()
+                    _gc_stats.update(result)
+                    if result["removed_files"]:
+                        print(f"Upload retention removed {result['removed_files']} files "
+                              f"({result['freed_bytes'] / (1024 * 1024):.1f} MB)")
+            except Exception as e:
+                print(f"Error applying upload retention: {str(e)}")
+            time.sleep(Config.UPLOAD_GC_INTERVAL)
+
+    _gc_thread = threading.Thread(target=run, name="upload-retention", daemon=True)
+    _gc_thread.start()
+    return _gc_thread
+
+def retention_stats():
+    """
+    Result of the last retention sweep run by this process
+
+    Returns:
+        dict: Sweep statistics (empty if this process has not swept)
+    """
+    return dict(_gc_stats)
@@ -1,35 +1,256 @@
+import threading
+
 import cv2
 import numpy as np
-import tensorflow as tf
 from config import Config
+from utils.tracing import traced
+
+# Perceptual hash size (bits = HASH_SIZE * HASH_SIZE)
+HASH_SIZE = 8
+
+# JPEG decode scales libjpeg can produce directly from the DCT coefficients
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+# A reduced decode keeps at least this multiple of the target size, so the
+# final resize still averages several source pixels per output pixel
+REDUCED_DECODE_MARGIN = 2
+
+# JPEG start-of-frame markers (baseline, progressive, lossless...), which carry the image size
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Per-thread resize scratch buffers, reused across images
+_scratch = threading.local()
 
-def preprocess_image(image_path):
+def jpeg_size(image_bytes):
     """
-    Preprocess image for prediction using the correct dimensions and format
-    based on the model diagnostic results.
+    Read the dimensions of a JPEG from its header without decoding it
     
     Args:
-        image_path (str): Path to the image file
+        image_bytes (bytes): Raw file contents
         
     Returns:
-        numpy.ndarray: Preprocessed image ready for model prediction
+        tuple: (width, height), or None if the data is not a readable JPEG
+    """
+    data = memoryview(image_bytes)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            # Markers without a length field
+            offset += 2
+            continue
+        length = (data[offset + 2] << 8) | data[offset + 3]
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height = (data[offset + 5] << 8) | data[offset + 6]
+            width = (data[offset + 7] << 8) | data[offset + 8]
+            return width, height
+        if marker == 0xDA:
+            # Start of scan: the frame header should have come before it
+            return None
+        offset += 2 + length
+    return None
+
+def reduced_decode_flag(image_bytes, min_size):
+    """
+    Pick the cheapest imdecode flag that still yields at least min_size
+    
+    Args:
+        image_bytes (bytes): Raw file contents
+        min_size (tuple): (width, height) the caller will resize to
+        
+    Returns:
+        int: A cv2.IMREAD_REDUCED_COLOR_* flag, or cv2.IMREAD_COLOR
+    """
+    size = jpeg_size(image_bytes)
+    if size is None:
+        return cv2.IMREAD_COLOR
+    
+    # EXIF rotation may swap the axes, so compare the short sides
+    shortest = min(size)
+    needed = max(min_size) * REDUCED_DECODE_MARGIN
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if shortest // factor >= needed:
+            return flag
+    return cv2.IMREAD_COLOR
+
+@traced("decode_image")
+def decode_image_bytes(image_bytes, min_size=None):
     """
-    # Load image
-    img = cv2.imread(image_path)
+    Decode an encoded image (JPEG, PNG, WebP...) held in memory
+    
+    Args:
+        image_bytes (bytes): Raw file contents, e.g. from an upload stream
+        min_size (tuple): Smallest (width, height) the caller needs; with
+            REDUCED_DECODE on, large JPEGs are then decoded at 1/2, 1/4 or
+            1/8 scale, which is several times faster than a full decode
+            followed by a downscale but changes the resulting pixels
+        
+    Returns:
+        numpy.ndarray: Decoded BGR image
+    """
+    flag = cv2.IMREAD_COLOR
+    if min_size is not None and Config.REDUCED_DECODE:
+        flag = reduced_decode_flag(image_bytes, min_size)
+    
+    buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+    img = cv2.imdecode(buffer, flag)
     if img is None:
-        raise ValueError(f"Could not read image at {image_path}")
+        raise ValueError("Could not decode image data")
+    return img
+
+def new_batch(size):
+    """
+    Allocate an uninitialized batch of model inputs for prepare_image(out=...)
+    
+    Args:
+        size (int): Number of images
+        
+    Returns:
+        numpy.ndarray: uint8 array of shape (size, height, width, 3)
+    """
+    width, height = Config.IMG_SIZE
+    return np.empty((size, height, width, 3), dtype=np.uint8)
+
+def pixels_to_float(pixels):
+    """
+    Normalize uint8 RGB pixels to the float32 [0, 1] inputs the CNN was trained on
+    
+    Only needed for models without in-graph preprocessing (and for tools
+    that feed the float Keras model directly); float input is returned as is.
+    
+    Args:
+        pixels (numpy.ndarray): uint8 batch of shape (N, height, width, 3)
+        
+    Returns:
+        numpy.ndarray: float32 batch of the same shape
+    """
+    if pixels.dtype == np.uint8:
+        return np.divide(pixels, np.float32(255.0), dtype=np.float32)
+    return pixels.astype(np.float32, copy=False)
+
+def float_to_pixels(batch):
+    """
+    Inverse of pixels_to_float, for callers that still hold normalized floats
+    
+    Args:
+        batch (numpy.ndarray): float batch in [0, 1] (uint8 is returned as is)
+        
+    Returns:
+        numpy.ndarray: uint8 batch of the same shape
+    """
+    if batch.dtype == np.uint8:
+        return batch
+    return np.clip(np.rint(batch * 255.0), 0, 255).astype(np.uint8)
+
+def _resize_buffer(width, height):
+    buffer = getattr(_scratch, "resized", None)
+    if buffer is None or buffer.shape != (height, width, 3):
+        buffer = _scratch.resized = np.empty((height, width, 3), dtype=np.uint8)
+    return buffer
+
+@traced("prepare_image")
+def prepare_image(img, out=None):
+    """
+    Turn a decoded BGR image into the model's input tensor
     
-    # Model expects 150x150 RGB images (based on model diagnostics)
-    img = cv2.resize(img, (150, 150))  # Resize to correct dimensions
+    The model input is the resized RGB image as uint8 pixels; scaling to
+    [0, 1] happens inside the model graph (see convert_model.py and the
+    backends in services.prediction_service), so batches and queues hold a
+    quarter of the bytes of float32 tensors. The resize goes into a
+    per-thread scratch buffer and the BGR to RGB swap is a single copy
+    straight into the output.
+    
+    Args:
+        img (numpy.ndarray): Decoded BGR image
+        out (numpy.ndarray): Optional uint8 destination of shape
+            (1, height, width, 3), e.g. a row slice of new_batch(); a new
+            array is allocated if omitted
+        
+    Returns:
+        numpy.ndarray: Preprocessed image ready for model prediction
+    """
+    width, height = Config.IMG_SIZE
+    if out is None:
+        out = new_batch(1)
+    
+    # Bilinear, the cv2.resize default the model was trained and validated with
+    resized = _resize_buffer(width, height)
+    cv2.resize(img, (width, height), dst=resized, interpolation=cv2.INTER_LINEAR)
+    
+    # Reversing the channel axis is a view, so the color swap is part of the copy
+    np.copyto(out[0], resized[:, :, ::-1])
+    
+    return out
+
+def dhash(img):
+    """
+    Compute the 64-bit difference hash of a decoded image
     
-    # Convert BGR to RGB (since model was likely trained on RGB)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    Args:
+        img (numpy.ndarray): Decoded BGR image
+        
+    Returns:
+        int: Perceptual hash, robust to resizing and re-encoding
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+@traced("preprocess_image")
+def preprocess_image(image_path, return_hash=False):
+    """
+    Preprocess image for prediction using the correct dimensions and format
+    based on the model diagnostic results.
     
-    # Scale pixel values to [0, 1]
-    img = img.astype(np.float32) / 255.0
+    Args:
+        image_path (str): Path to the image file
+        return_hash (bool): Also return the perceptual hash of the image
+        
+    Returns:
+        numpy.ndarray: uint8 RGB pixels of shape (1, height, width, 3) for an
+        inference backend; use pixels_to_float() to feed a bare Keras model
+        (or a (image, phash) tuple when return_hash is set)
+    """
+    # Load image (read as bytes so large JPEGs can be decoded at reduced scale with REDUCED_DECODE)
+    try:
+        with open(image_path, "rb") as f:
+            img = decode_image_bytes(f.read(), Config.IMG_SIZE)
+    except (OSError, ValueError):
+        raise ValueError(f"Could not read image at {image_path}")
     
-    # Add batch dimension
-    img = np.expand_dims(img, axis=0)
+    processed = prepare_image(img)
+    print(f"Preprocessed image shape: {processed.shape}")
+    if return_hash:
+        return processed, dhash(img)
+    return processed
+
+@traced("preprocess_image")
+def preprocess_image_bytes(image_bytes, return_hash=False, out=None):
+    """
+    Preprocess an in-memory upload without touching the filesystem
     
-    print(f"Preprocessed image shape: {img.shape}")
-    return img
\ No newline at end of file
+    Args:
+        image_bytes (bytes): Raw file contents
+        return_hash (bool): Also return the perceptual hash of the image
+        out (numpy.ndarray): Optional destination, as for prepare_image
+        
+    Returns:
+        numpy.ndarray: uint8 RGB pixels of shape (1, height, width, 3), as
+        for preprocess_image (or a (image, phash) tuple when return_hash is set)
+    """
+    img = decode_image_bytes(image_bytes, Config.IMG_SIZE)
+    if return_hash:
+        return prepare_image(img, out), dhash(img)
+    return prepare_image(img, out)
\ No newline at end of file
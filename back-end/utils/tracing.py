@@ -0,0 +1,200 @@
+"""
+Opt-in per-request trace spans.
+
+A sampled request gets a trace (see start_trace); functions decorated with
+@traced and blocks wrapped in span() record how long they took and how they
+nest. Requests that are not sampled pay only for a context variable lookup
+per decorated call. Finished traces are kept in a small ring buffer for the
+admin endpoint and summarized in a Server-Timing response header.
+
+Traces follow the request through threads and asyncio tasks that inherit its
+context; work handed to other threads (the batch scheduler, decode pools)
+shows up as the time the request spent waiting for it.
+"""
+import contextvars
+import functools
+import inspect
+import random
+import threading
+import time
+import uuid
+from collections import deque
+
+_current = contextvars.ContextVar("ayurvignana_trace", default=None)
+
+class Trace:
+    """
+    Spans recorded for one request
+
+    Args:
+        name: Request name, e.g. "POST /api/predict"
+    """
+
+    def __init__(self, name):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.duration_ms = None
+        self.spans = []
+        self._stack = []
+        self._lock = threading.Lock()
+
+    def begin(self, name, attributes=None):
+        span = {
+            "name": name,
+            "start_ms": round((time.perf_counter() - self._origin) * 1000.0, 3),
+            "duration_ms": None,
+            "parent": self._stack[-1] if self._stack else None,
+        }
+        if attributes:
+            span["attributes"] = attributes
+        with self._lock:
+            span["id"] = len(self.spans)
+            self.spans.append(span)
+        self._stack.append(span["id"])
+        return span
+
+    def end(self, span, error=None):
+        span["duration_ms"] = round((time.perf_counter() - self._origin) * 1000.0 - span["start_ms"], 3)
+        if error is not None:
+            span["error"] = repr(error)
+        if self._stack and self._stack[-1] == span["id"]:
+            self._stack.pop()
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._origin) * 1000.0, 3)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "spans": list(self.spans),
+        }
+
+    def server_timing(self):
+        """Top-level spans as a Server-Timing header value"""
+        entries = []
+        for span in self.spans:
+            if span["parent"] is None and span["duration_ms"] is not None:
+                name = "".join(c if c.isalnum() or c in "-_" else "_" for c in span["name"])
+                entries.append(f"{name};dur={span['duration_ms']}")
+        if self.duration_ms is not None:
+            entries.append(f"total;dur={self.duration_ms}")
+        return ", ".join(entries)
+
+class _Span:
+    __slots__ = ("_name", "_attributes", "_trace", "_span")
+
+    def __init__(self, name, attributes):
+        self._name = name
+        self._attributes = attributes
+        self._trace = None
+        self._span = None
+
+    def __enter__(self):
+        self._trace = _current.get()
+        if self._trace is not None:
+            self._span = self._trace.begin(self._name, self._attributes)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._trace.end(self._span, exc)
+        return False
+
+def span(name, **attributes):
+    """Record a block as a span of the current trace (no-op when not traced)"""
+    return _Span(name, attributes)
+
+def traced(name=None):
+    """
+    Decorator recording every call of a function as a span
+
+    Args:
+        name: Span name (defaults to module.function)
+    """
+    def decorate(func):
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current.get() is None:
+                    return await func(*args, **kwargs)
+                with _Span(span_name, None):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return func(*args, **kwargs)
+            with _Span(span_name, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+class TraceRecorder:
+    """
+    Samples requests for tracing and keeps the most recent traces
+
+    Args:
+        sample_rate: Fraction of requests traced (0 disables sampling)
+        buffer_size: Number of finished traces retained
+    """
+
+    def __init__(self, sample_rate=0.0, buffer_size=100):
+        self.sample_rate = float(sample_rate)
+        self._traces = deque(maxlen=max(1, int(buffer_size)))
+        self._lock = threading.Lock()
+
+    def start_trace(self, name, force=False):
+        """
+        Begin tracing the current request if it is sampled
+
+        Args:
+            name: Request name
+            force: Trace regardless of the sample rate
+
+        Returns:
+            tuple: (trace or None, token for finish_trace)
+        """
+        if not force and (self.sample_rate <= 0.0 or random.random() >= self.sample_rate):
+            return None, None
+        trace = Trace(name)
+        return trace, _current.set(trace)
+
+    def finish_trace(self, trace, token):
+        """End a trace started by start_trace and keep it for inspection"""
+        if trace is None:
+            return
+        trace.finish()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # Finished from a different context than it was started in
+            _current.set(None)
+        with self._lock:
+            self._traces.append(trace.to_dict())
+
+    def recent(self, limit=None):
+        """
+        Most recent finished traces, newest first
+
+        Args:
+            limit: Maximum number of traces returned
+
+        Returns:
+            list: Trace dictionaries
+        """
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        return traces[:limit] if limit else traces
+
+def current_trace():
+    """The trace of the running request, or None if it is not traced"""
+    return _current.get()